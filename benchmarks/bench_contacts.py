@@ -0,0 +1,60 @@
+"""Contact store import, load and lookup cost at large sizes.
+
+Run from the project root:  python -m benchmarks.bench_contacts --contacts 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.utils.contact_store import ContactStore
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contacts', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    people = [(''.join(rng.choice(letters) for _ in range(rng.randint(5, 9))) + f" {i}", f"+1 555 {i:07d}")
+              for i in range(args.contacts)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'contacts.json')
+        store = ContactStore(path)
+
+        def import_all():
+            with store.batch():
+                for name, number in people:
+                    store.set(name, number)
+        _, elapsed = timed(import_all)
+        print(f"batched import : {args.contacts / elapsed:10.0f} contacts/sec ({elapsed:.2f}s)")
+
+        _, elapsed = timed(lambda: ContactStore(path))
+        print(f"cold load      : {elapsed * 1000:10.1f} ms")
+
+        samples = [rng.choice(people) for _ in range(args.lookups)]
+        for label, fn in (
+            ('exact lookup', lambda: [store.lookup(name) for name, _ in samples]),
+            ('reverse lookup', lambda: [store.names_for_number(number.replace(' ', '')) for _, number in samples]),
+            ('prefix lookup', lambda: [store.names_with_prefix(name[:4]) for name, _ in samples]),
+        ):
+            _, elapsed = timed(fn)
+            print(f"{label:<15}: {elapsed / args.lookups * 1e6:10.2f} us/lookup")
+
+        typos = [name[:2] + 'x' + name[3:] for name, _ in samples[:100]]
+        _, elapsed = timed(lambda: [store.lookup(typo) for typo in typos])
+        print(f"fuzzy lookup   : {elapsed / len(typos) * 1000:10.2f} ms/lookup")
+
+
+if __name__ == '__main__':
+    main()
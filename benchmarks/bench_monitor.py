@@ -0,0 +1,82 @@
+"""Detection latency and idle CPU of the incoming message monitor.
+
+Incoming messages are injected into the stub chat and timed until they
+reach an on_message callback. Idle CPU is sampled for this process and,
+when psutil is installed, for the Chrome processes it spawned.
+
+Run from the project root:  python -m benchmarks.bench_monitor --messages 50 --idle 10
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.stub_server import StubWhatsAppServer, point_settings_at
+
+
+def child_cpu_seconds():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0.0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            times = child.cpu_times()
+            total += times.user + times.system
+        except psutil.Error:
+            continue
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--idle', type=float, default=10.0, help="Seconds to sample idle CPU")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, StubWhatsAppServer() as server:
+        point_settings_at(server.url, workdir)
+        from src.whatsapp_client import WhatsAppClient
+        client = WhatsAppClient()
+        try:
+            client.view_messages("+15550000001")  # Open the stub chat
+
+            sent_at = {}
+            latencies = []
+            arrived = threading.Event()
+
+            @client.on_message
+            def record(message):
+                started = sent_at.pop(message['text'], None)
+                if started is not None:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    arrived.set()
+
+            for i in range(args.messages):
+                text = f"incoming {i}"
+                arrived.clear()
+                with client.lock:
+                    sent_at[text] = time.perf_counter()
+                    client.driver.execute_script("stubIncoming(arguments[0])", text)
+                arrived.wait(5)
+
+            wall, cpu, chrome = time.time(), time.process_time(), child_cpu_seconds()
+            time.sleep(args.idle)
+            wall = time.time() - wall
+            cpu = time.process_time() - cpu
+
+            print(f"detected {len(latencies)}/{args.messages} messages")
+            if len(latencies) > 1:
+                print(f"detection latency p50 {statistics.median(latencies):.1f} ms, "
+                      f"p95 {statistics.quantiles(latencies, n=20)[18]:.1f} ms")
+            print(f"idle CPU (python): {100 * cpu / wall:.2f}%")
+            if chrome is not None:
+                print(f"idle CPU (browser): {100 * (child_cpu_seconds() - chrome) / wall:.2f}%")
+        finally:
+            client.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Measure WhatsAppClientPool send throughput for several pool sizes.
+
+Run from the project root:  python -m benchmarks.bench_pool --messages 40 --sizes 1 2 4 8
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.stub_server import StubWhatsAppServer, point_settings_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=40)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    from src.client_pool import WhatsAppClientPool
+    results = []
+    with StubWhatsAppServer() as server:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as workdir:
+                point_settings_at(server.url, workdir)
+                pool = WhatsAppClientPool(size)
+                try:
+                    pool.view_messages("+15550000000")  # Wait until at least one worker is up
+                    start = time.perf_counter()
+                    futures = [pool.submit('send_message', f"+1555000{i % 16:04d}", f"pool {i}")
+                               for i in range(args.messages)]
+                    sent = sum(1 for f in futures if f.result())
+                    results.append((size, sent / (time.perf_counter() - start)))
+                finally:
+                    pool.cleanup()
+
+    print(f"{'workers':>8} {'msgs/sec':>10}")
+    for size, throughput in results:
+        print(f"{size:>8} {throughput:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Compare per-call send_message against the batched enqueue/flush dispatcher.
+
+Run from the project root:  python -m benchmarks.bench_send_queue --messages 50 --chats 5
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.stub_server import StubWhatsAppServer, point_settings_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--chats', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, StubWhatsAppServer() as server:
+        point_settings_at(server.url, workdir)
+        from src.whatsapp_client import WhatsAppClient
+        client = WhatsAppClient()
+        try:
+            numbers = [f"+1555000{i:04d}" for i in range(args.chats)]
+            per_chat = max(1, args.messages // args.chats)
+
+            start = time.perf_counter()
+            for number in numbers:
+                for i in range(per_chat):
+                    client.send_message(number, f"baseline {i}")
+            baseline = len(numbers) * per_chat / (time.perf_counter() - start)
+
+            for number in numbers:
+                for i in range(per_chat):
+                    client.enqueue(number, f"queued {i}")
+            report = client.flush()
+
+            print(f"send_message loop : {baseline:8.2f} msgs/sec")
+            print(f"enqueue + flush   : {report['throughput']:8.2f} msgs/sec "
+                  f"({report['sent']} sent, {report['failed']} failed)")
+            print(f"stub server received {len(server.sent)} messages")
+        finally:
+            client.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Soak test: browser memory over a long run of sends, lean mode vs full mode.
+
+Sends messages to a rotating set of chats against the stub server and
+samples, every --interval seconds, the resident memory of the whole Chrome
+process tree (from /proc, so Linux only) and the page's JS heap. With
+--budget-mb the heap watchdog is checked at every sample, so recycles show
+up as drops in the curve.
+
+Run from the project root:  python -m benchmarks.bench_soak --minutes 30 --modes lean full
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.stub_server import StubWhatsAppServer, point_settings_at
+
+
+def tree_rss_mb(root_pid):
+    """Summed RSS of root_pid and all of its descendants, in MB"""
+    parents = {}
+    rss_pages = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue  # Exited while we were scanning
+        parents[int(name)] = int(fields[1])
+        rss_pages[int(name)] = int(fields[21])
+    tree = {root_pid}
+    grew = True
+    while grew:
+        grew = False
+        for pid, parent in parents.items():
+            if parent in tree and pid not in tree:
+                tree.add(pid)
+                grew = True
+    return sum(rss_pages.get(pid, 0) for pid in tree) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def soak(server, mode, args):
+    from config import settings
+    settings.LEAN_MODE = mode == 'lean'
+    settings.MEMORY_BUDGET_MB = args.budget_mb
+    settings.MEMORY_CHECK_INTERVAL = 10 ** 9  # Checked below at each sample instead of by the monitor
+    from src.whatsapp_client import WhatsAppClient
+    from src.utils.metrics import metrics
+
+    client = WhatsAppClient()
+    samples = []
+    numbers = server.numbers()
+    start = time.monotonic()
+    next_sample = start
+    sent = 0
+    try:
+        while time.monotonic() - start < args.minutes * 60:
+            client.send_message(numbers[sent % len(numbers)], f"soak {sent}")
+            sent += 1
+            if time.monotonic() < next_sample:
+                continue
+            next_sample += args.interval
+            with client.lock:
+                if args.budget_mb:
+                    client.check_memory()
+                heap = client.heap_usage_mb()
+            recycles = sum(c['value'] for c in metrics.snapshot()['counters']
+                           if c['name'] == 'browser_recycle_total')
+            samples.append({'t': round(time.monotonic() - start, 1), 'sent': sent,
+                            'rss_mb': round(tree_rss_mb(client.driver.service.process.pid), 1),
+                            'heap_mb': round(heap, 1), 'recycles': recycles})
+            print(f"{mode:<5} {samples[-1]['t']:>8.0f}s {sent:>7} sent "
+                  f"{samples[-1]['rss_mb']:>8.0f} MB RSS {samples[-1]['heap_mb']:>7.1f} MB heap {recycles:>3} recycles")
+    finally:
+        client.cleanup()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=15, help="Seconds between memory samples")
+    parser.add_argument('--modes', nargs='+', choices=['lean', 'full'], default=['lean', 'full'])
+    parser.add_argument('--chats', type=int, default=20)
+    parser.add_argument('--history', type=int, default=200, help="Messages pre-rendered in every chat")
+    parser.add_argument('--budget-mb', type=int, default=0, help="Heap budget for the recycle watchdog (0: off)")
+    parser.add_argument('--output', metavar='FILE', help="Write all samples as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with StubWhatsAppServer(chats=args.chats, messages=args.history) as server:
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as workdir:
+                point_settings_at(server.url, workdir)
+                results[mode] = soak(server, mode, args)
+
+    print(f"\n{'mode':<5} {'start RSS':>10} {'end RSS':>10} {'peak RSS':>10} {'end heap':>10} {'recycles':>9}")
+    for mode, samples in results.items():
+        if not samples:
+            continue
+        print(f"{mode:<5} {samples[0]['rss_mb']:>7.0f} MB {samples[-1]['rss_mb']:>7.0f} MB "
+              f"{max(s['rss_mb'] for s in samples):>7.0f} MB {samples[-1]['heap_mb']:>7.1f} MB "
+              f"{samples[-1]['recycles']:>9}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'samples': results}, f, indent=2)
+        print(f"[✓] Samples saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Import-time and contact lookup cost of the CLI without a browser.
+
+Runs ``python -X importtime -c "import src.cli_interface"`` in a fresh
+interpreter, reports the total and the slowest modules, checks that no
+browser/imaging dependency was imported, and times ContactManager lookups.
+
+Run from the project root:  python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('selenium', 'selenium_stealth', 'PIL')
+
+
+def import_profile(module):
+    probe = (f"import sys, {module}; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        rows.append((int(cumulative_us), int(own_us), name.rstrip()[1:]))
+    heavy = [m for m in result.stdout.strip().split(',') if m]
+    return rows, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--module', default='src.cli_interface')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows, heavy = import_profile(args.module)
+    top_level = [r for r in rows if not r[2].startswith(' ')]
+    total_ms = sum(r[0] for r in top_level) / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms cumulative")
+    for cumulative, own, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name.strip()}")
+    print(f"heavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+
+    sys.path.insert(0, PROJECT_ROOT)
+    start = time.perf_counter()
+    from src.cli_interface import ContactManager
+    contacts = ContactManager()
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        contacts.get_number(f"contact {i}")
+    per_lookup_us = (time.perf_counter() - start) / args.lookups * 1e6
+    print(f"ContactManager load: {load_ms:.1f} ms, get_number: {per_lookup_us:.2f} us/lookup")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""VCF import/export throughput on a generated address book.
+
+Run from the project root:  python -m benchmarks.bench_vcf --megabytes 200
+Peak RSS is reported where the resource module is available.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.utils.contact_store import ContactStore
+from src.utils.vcf import iter_vcf_contacts, write_vcf
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CARD = ("BEGIN:VCARD\r\nVERSION:3.0\r\nFN:{name}\r\nN:{last};{first};;;\r\n"
+        "TEL;TYPE=CELL:+1 555 {i:07d}\r\nTEL;TYPE=WORK:+1 666 {i:07d}\r\n"
+        "EMAIL;TYPE=INTERNET:{first}.{last}@example.com\r\nNOTE:{note}\r\nEND:VCARD\r\n")
+
+
+def generate(path, megabytes):
+    rng = random.Random(42)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    target = megabytes * 1024 * 1024
+    cards = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        while f.tell() < target:
+            first = ''.join(rng.choice(letters) for _ in range(rng.randint(4, 8)))
+            last = ''.join(rng.choice(letters) for _ in range(rng.randint(5, 10)))
+            f.write(CARD.format(name=f"{first} {last} {cards}", first=first, last=last,
+                                i=cards, note='x' * rng.randint(0, 60)))
+            cards += 1
+    return cards
+
+
+def peak_rss_mb():
+    if resource is None:
+        return float('nan')
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabytes', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'contacts.vcf')
+        cards = generate(source, args.megabytes)
+        print(f"generated      : {cards} cards, {os.path.getsize(source) / 1e6:.0f} MB")
+
+        start = time.perf_counter()
+        parsed = sum(1 for _ in iter_vcf_contacts(source, workers=args.workers))
+        elapsed = time.perf_counter() - start
+        print(f"parse only     : {parsed / elapsed:10.0f} records/sec ({elapsed:.2f}s)")
+        print(f"peak RSS       : {peak_rss_mb():10.0f} MB (streaming parse)")
+
+        store = ContactStore(os.path.join(workdir, 'contacts.json'))
+        start = time.perf_counter()
+        with store.batch():
+            for name, numbers in iter_vcf_contacts(source, workers=args.workers):
+                for index, (number, kind) in enumerate(numbers):
+                    store.set(name.lower() if not index else f"{name.lower()} ({kind})", number)
+        elapsed = time.perf_counter() - start
+        print(f"import         : {cards / elapsed:10.0f} records/sec ({elapsed:.2f}s)")
+
+        start = time.perf_counter()
+        written = write_vcf(os.path.join(workdir, 'export.vcf'), store.contacts.items())
+        elapsed = time.perf_counter() - start
+        print(f"export         : {written / elapsed:10.0f} records/sec ({elapsed:.2f}s)")
+        print(f"peak RSS       : {peak_rss_mb():10.0f} MB (with {len(store.contacts)} contacts loaded)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""p50/p95 latency of send_message and view_messages with polling vs observer waits.
+
+"before" replays the old behaviour (humanized pauses + WebDriverWait polling),
+"after" uses MutationObserver waits with pacing disabled.
+
+Run from the project root:  python -m benchmarks.bench_waits --runs 20
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from benchmarks.stub_server import StubWhatsAppServer, point_settings_at
+from config import settings
+
+MODES = {
+    'before': {'HUMANIZE': True, 'WAIT_STRATEGY': 'poll'},
+    'after': {'HUMANIZE': False, 'WAIT_STRATEGY': 'observer'}
+}
+
+
+def measure(fn, runs):
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(samples, n=20)
+    return statistics.median(samples), cuts[18]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, StubWhatsAppServer() as server:
+        point_settings_at(server.url, workdir)
+        from src.whatsapp_client import WhatsAppClient
+        client = WhatsAppClient()
+        try:
+            print(f"{'mode':>8} {'op':>6} {'p50 ms':>10} {'p95 ms':>10}")
+            for mode, overrides in MODES.items():
+                for name, value in overrides.items():
+                    setattr(settings, name, value)
+                ops = {
+                    'send': lambda i: client.send_message("+15550000001", f"latency {i}"),
+                    'view': lambda i: client.view_messages("+15550000001")
+                }
+                for op, fn in ops.items():
+                    p50, p95 = measure(fn, args.runs)
+                    print(f"{mode:>8} {op:>6} {p50:>10.1f} {p95:>10.1f}")
+        finally:
+            client.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""Local stub of the WhatsApp Web pages used by the benchmarks.
+
+The page mimics just enough of the real DOM for the candidates in
+``config/settings.SELECTORS`` to resolve: a QR canvas that disappears after a
+short delay, the chat list "New chat" button, and a chat view with a
+composer, send/attach buttons and a message list.
+
+The fake account is configurable: ``chats`` rows in the chat list,
+``messages`` history rows pre-rendered in every chat, and ``latency_ms``
+added to every page load and chat render.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>WhatsApp</title></head>
+<body>
+<div id="app"></div>
+<script>
+const params = new URLSearchParams(location.search);
+const app = document.getElementById('app');
+const STUB = __STUB_CONFIG__;
+
+function report(kind, text) {
+    fetch('/api/sent', {method: 'POST', body: JSON.stringify({
+        phone: currentPhone, kind: kind, text: text
+    })});
+}
+
+let messageCounter = 0;
+let currentPhone = params.get('phone');
+const sentTexts = {};  // phone -> texts sent from this page, shown again when the chat is reopened
+
+function appendMessage(text, sender, replay) {
+    const incoming = !!sender;
+    if (!incoming && !replay) (sentTexts[currentPhone] = sentTexts[currentPhone] || []).push(text);
+    const row = document.createElement('div');
+    row.className = '_akbu';
+    row.setAttribute('data-id', (incoming ? 'false_' : 'true_') + currentPhone + '@c.us_' + (++messageCounter));
+    const now = new Date();
+    row.innerHTML = '<div class="copyable-text"><span class="_ao3e selectable-text copyable-text"></span></div>';
+    row.firstChild.setAttribute('data-pre-plain-text',
+        '[' + now.toLocaleTimeString() + ', ' + now.toLocaleDateString() + '] ' + (sender || 'You') + ': ');
+    row.querySelector('span').textContent = text;
+    document.getElementById('messages').appendChild(row);
+}
+
+function drawQR(canvas) {
+    // QR-shaped noise: finder patterns in three corners, random modules elsewhere
+    const ctx = canvas.getContext('2d');
+    const size = 25, scale = 8, margin = 32;
+    ctx.fillStyle = '#fff';
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    ctx.fillStyle = '#000';
+    const finder = (r, c) => r >= 0 && c >= 0 && r < 7 && c < 7 && (r % 6 === 0 || c % 6 === 0 || (r > 1 && r < 5 && c > 1 && c < 5));
+    for (let r = 0; r < size; r++) {
+        for (let c = 0; c < size; c++) {
+            const inFinder = (r < 8 && c < 8) || (r < 8 && c >= size - 8) || (r >= size - 8 && c < 8);
+            const on = inFinder ? finder(r, c) || finder(r, c - size + 7) || finder(r - size + 7, c) : Math.random() < 0.5;
+            if (on) ctx.fillRect(margin + c * scale, margin + r * scale, scale, scale);
+        }
+    }
+}
+
+function renderLogin() {
+    app.innerHTML = '<canvas aria-label="Scan this QR code to link a device!" width="264" height="264"></canvas>';
+    const canvas = app.querySelector('canvas');
+    drawQR(canvas);
+    const rotate = setInterval(() => drawQR(canvas), STUB.qrRotateMs);
+    setTimeout(() => {
+        clearInterval(rotate);
+        let rows = '';
+        for (let i = 0; i < STUB.chats; i++) {
+            rows += '<div role="listitem"><span title="Chat ' + i + '">Chat ' + i + '</span></div>';
+        }
+        app.innerHTML = '<div data-testid="chat-list-search"><div contenteditable="true"></div></div><button title="New chat">New chat</button>' +
+            '<div id="pane-side">' + rows + '</div>';
+    }, STUB.qrDelayMs);
+}
+
+function renderChat() {
+    if (params.get('phone').startsWith('999')) {
+        // Numbers starting 999 play the "not on WhatsApp" case
+        app.innerHTML = '<div role="dialog">Phone number shared via url is invalid.<button>OK</button></div>';
+        return;
+    }
+    let rows = '';
+    for (let i = 0; i < STUB.chats; i++) {
+        const phone = '1555000' + String(i).padStart(4, '0');
+        rows += '<div role="listitem"><span title="' + phone + '">' + phone + '</span></div>';
+    }
+    app.innerHTML = `
+        <div id="side"><div data-testid="chat-list-search"><div id="search" contenteditable="true"></div></div>
+        <button title="New chat">New chat</button><div id="pane-side">${rows}</div></div>
+        <div id="chat"></div>`;
+    const search = document.getElementById('search');
+    search.addEventListener('input', () => {
+        const query = search.textContent.replace(/\\D/g, '');
+        for (const row of app.querySelectorAll('#pane-side [role=listitem]')) {
+            row.style.display = row.textContent.includes(query) ? '' : 'none';
+        }
+    });
+    app.querySelector('#pane-side').addEventListener('click', (e) => {
+        const title = e.target.closest('[role=listitem]');
+        if (title) openChat(title.textContent, null);  // In-app switch, no page load
+    });
+    openChat(params.get('phone'), params.get('text'));
+}
+
+function openChat(phone, text) {
+    currentPhone = phone;
+    messageCounter = 0;
+    const chat = document.getElementById('chat');
+    chat.innerHTML = `
+        <div id="main"><header><span title="${phone}"></span></header>
+        <div class="x1n2onr6 x1vjfegm x1cqoux5 x14yy4lh"><div id="messages"></div></div>
+        <footer>
+            <button id="attach"><span data-icon="plus"></span></button>
+            <input type="file" style="display:none" multiple>
+            <div id="composer" contenteditable="true"></div>
+            <button id="send" style="display:none"><span data-icon="send"></span></button>
+        </footer></div>`;
+    const composer = document.getElementById('composer');
+    const sendBtn = document.getElementById('send');
+    const fileInput = chat.querySelector('input[type=file]');
+    let pendingFile = null;
+
+    function refresh() {
+        sendBtn.style.display = (composer.textContent || pendingFile) ? '' : 'none';
+    }
+    function submit() {
+        if (pendingFile) {
+            const caption = chat.querySelector('p.selectable-text');
+            appendMessage(pendingFile + (caption ? ' ' + caption.textContent : ''));
+            report('file', pendingFile);
+            if (caption) caption.remove();
+            pendingFile = null;
+        } else if (composer.textContent) {
+            appendMessage(composer.textContent);
+            report('text', composer.textContent);
+            composer.textContent = '';
+        }
+        refresh();
+    }
+    composer.addEventListener('input', refresh);
+    composer.addEventListener('keydown', (e) => {
+        if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); submit(); }
+    });
+    sendBtn.addEventListener('click', submit);
+    fileInput.addEventListener('change', () => {
+        pendingFile = Array.from(fileInput.files).map(f => f.name).join(',');
+        const caption = document.createElement('p');
+        caption.className = 'selectable-text copyable-text x15bjb6t x1n2onr6';
+        caption.contentEditable = 'true';
+        chat.appendChild(caption);
+        refresh();
+    });
+    for (let i = 0; i < STUB.history; i++) {
+        appendMessage('history ' + i, i % 2 ? null : 'Stub Contact', true);
+    }
+    (sentTexts[phone] || []).forEach((sent) => appendMessage(sent, null, true));
+    if (text) composer.textContent = text;
+    refresh();
+}
+
+// Benchmarks simulate an incoming message with driver.execute_script("stubIncoming(...)")
+window.stubIncoming = (text, sender) => appendMessage(text, sender || 'Stub Contact');
+
+if (location.pathname === '/send') {
+    setTimeout(renderChat, STUB.latencyMs);  // Client-side render cost of a chat
+} else {
+    renderLogin();
+}
+</script>
+</body>
+</html>
+"""
+
+
+class StubWhatsAppServer:
+    """Serve the stub page on localhost and record every message it receives."""
+
+    def __init__(self, host='127.0.0.1', port=0, qr_delay_ms=300, chats=1, messages=0, latency_ms=0,
+                 qr_rotate_ms=20000):
+        self.sent = []
+        self.sent_lock = threading.Lock()
+        self.chats = chats
+        self.latency = latency_ms / 1000
+        config = {'qrDelayMs': qr_delay_ms, 'qrRotateMs': qr_rotate_ms, 'chats': chats, 'history': messages,
+                  'latencyMs': latency_ms}
+        page = PAGE.replace('__STUB_CONFIG__', json.dumps(config)).encode('utf-8')
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/api/stats':
+                    with server.sent_lock:
+                        self._reply(200, 'application/json', json.dumps({'sent': len(server.sent)}).encode())
+                elif path == '/favicon.ico':
+                    self._reply(404, 'text/plain', b'')
+                else:
+                    time.sleep(server.latency)  # Network round trip of a page load
+                    self._reply(200, 'text/html; charset=utf-8', page)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with server.sent_lock:
+                    server.sent.append(json.loads(body or b'{}'))
+                self._reply(204, 'text/plain', b'')
+
+            def _reply(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def numbers(self):
+        """Phone numbers of the fake chats"""
+        return [f"+1555000{i:04d}" for i in range(self.chats)]
+
+
+def point_settings_at(url, workdir):
+    """Redirect the client at a stub server and keep its state out of the real session dir."""
+    from config import settings
+    settings.WHATSAPP_URL = url
+    settings.PATHS['cookies'] = f"{workdir}/cookies.pkl"
+    settings.PATHS['outbox'] = f"{workdir}/outbox.jsonl"
+    settings.PATHS['profiles'] = f"{workdir}/profiles"
+    settings.PATHS['profile'] = f"{workdir}/profile"
+    settings.PATHS['storage'] = f"{workdir}/storage.json"
+    settings.PATHS['messages_db'] = f"{workdir}/messages.db"
+    settings.PATHS['number_cache'] = f"{workdir}/numbers.json"
+    settings.PATHS['media_upload'] = f"{workdir}/uploads"
+    settings.PATHS['media_cache'] = f"{workdir}/media_cache"
+    settings.PATHS['media_download'] = f"{workdir}/downloads"
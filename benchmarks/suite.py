@@ -0,0 +1,240 @@
+"""Offline benchmark suite: send, attach, view and monitor against the stub server.
+
+Each scenario records per-operation latency (p50/p95/mean), throughput
+and chromedriver round trips per operation. Results are saved as
+benchmarks/results/<label>.json (label defaults to the git commit), so runs
+from different versions can be compared:
+
+    python -m benchmarks.suite --iterations 20 --chats 5 --history 200
+    python -m benchmarks.suite --compare v1.0          # diff against a stored run
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.stub_server import StubWhatsAppServer, point_settings_at
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+REGRESSION_THRESHOLD = 0.10  # Flag p50 slowdowns beyond 10%
+
+
+def git_label():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime('%Y%m%d-%H%M%S')
+
+
+def round_trips():
+    from src.utils.metrics import metrics
+    snapshot = metrics.snapshot()
+    return sum(c['value'] for c in snapshot['counters'] if c['name'] == 'webdriver_command_total')
+
+
+def summarize(latencies, ok, elapsed, commands, unit):
+    count = len(latencies)
+    result = {'count': count, 'ok': ok, 'elapsed_s': round(elapsed, 3),
+              'throughput': round(ok / elapsed, 2) if elapsed else 0.0, 'unit': unit,
+              'round_trips_per_op': round(commands / count, 1) if count else 0.0}
+    if latencies:
+        result['p50_ms'] = round(statistics.median(latencies), 1)
+        result['p95_ms'] = round(statistics.quantiles(latencies, n=20)[18] if count > 1 else latencies[0], 1)
+        result['mean_ms'] = round(statistics.mean(latencies), 1)
+    return result
+
+
+def run_calls(calls, unit='ops/sec'):
+    """Time each call; a falsy result counts as a failure"""
+    latencies = []
+    ok = 0
+    commands = round_trips()
+    start = time.perf_counter()
+    for call in calls:
+        call_start = time.perf_counter()
+        if call():
+            ok += 1
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    return summarize(latencies, ok, time.perf_counter() - start, round_trips() - commands, unit)
+
+
+def chat_switches():
+    from src.utils.metrics import metrics
+    snapshot = metrics.snapshot()
+    return {c['labels']['method']: c['value'] for c in snapshot['counters'] if c['name'] == 'chat_switch_total'}
+
+
+def scenario_send(client, server, args):
+    numbers = server.numbers()
+    before = chat_switches()
+    result = run_calls([
+        (lambda i=i: client.send_message(numbers[i % len(numbers)], f"bench {i}")) for i in range(args.iterations)
+    ], 'msgs/sec')
+    # Rotating through --chats recipients: only the first visit to each should reload the app
+    result['chat_switches'] = {method: count - before.get(method, 0) for method, count in chat_switches().items()
+                               if count > before.get(method, 0)}
+    return result
+
+
+def scenario_attach(client, server, args):
+    from config import settings
+    os.makedirs(settings.PATHS['media_upload'], exist_ok=True)
+    path = os.path.join(settings.PATHS['media_upload'], 'bench.bin')
+    with open(path, 'wb') as f:
+        f.write(os.urandom(args.attach_kb * 1024))
+    numbers = server.numbers()
+    return run_calls([
+        (lambda i=i: client.send_file(numbers[i % len(numbers)], path, f"caption {i}")) for i in range(args.iterations)
+    ], 'files/sec')
+
+
+def scenario_view(client, server, args):
+    numbers = server.numbers()
+    counts = []
+
+    def view(number):
+        messages = client.view_messages(number)
+        counts.append(len(messages or ()))
+        return messages is not None
+
+    result = run_calls([(lambda i=i: view(numbers[i % len(numbers)])) for i in range(args.iterations)], 'views/sec')
+    result['messages_per_view'] = round(statistics.mean(counts), 1) if counts else 0
+    return result
+
+
+def scenario_monitor(client, server, args):
+    client.view_messages(server.numbers()[0])  # Open a chat to inject into
+    sent_at = {}
+    latencies = []
+    arrived = threading.Event()
+
+    def record(message):
+        started = sent_at.pop(message.get('text'), None)
+        if started is not None:
+            latencies.append((time.perf_counter() - started) * 1000)
+            arrived.set()
+
+    client.on_message(record)
+    commands = round_trips()
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        text = f"incoming {i}"
+        arrived.clear()
+        with client.lock:
+            sent_at[text] = time.perf_counter()
+            client.driver.execute_script("stubIncoming(arguments[0])", text)
+        arrived.wait(5)
+    client.message_callbacks.remove(record)
+    return summarize(latencies, len(latencies), time.perf_counter() - start, round_trips() - commands, 'msgs/sec')
+
+
+SCENARIO_RUNNERS = {
+    'send': scenario_send,
+    'attach': scenario_attach,
+    'view': scenario_view,
+    'monitor': scenario_monitor,
+}
+
+
+def run_suite(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, \
+            StubWhatsAppServer(chats=args.chats, messages=args.history, latency_ms=args.latency_ms) as server:
+        point_settings_at(server.url, workdir)
+        from src.whatsapp_client import WhatsAppClient
+
+        start = time.perf_counter()
+        client = WhatsAppClient()
+        elapsed = time.perf_counter() - start
+        results['startup'] = {'count': 1, 'ok': 1, 'elapsed_s': round(elapsed, 3), 'p50_ms': round(elapsed * 1000, 1)}
+        try:
+            for name in args.scenarios:
+                print(f"[•] Running {name} x{args.iterations}", file=sys.stderr)
+                results[name] = SCENARIO_RUNNERS[name](client, server, args)
+        finally:
+            client.cleanup()
+    return results
+
+
+def load_results(label):
+    path = label if label.endswith('.json') else os.path.join(RESULTS_DIR, f"{label}.json")
+    if label == 'latest':
+        stored = sorted((os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+                         if name.endswith('.json')), key=os.path.getmtime)
+        if not stored:
+            raise FileNotFoundError("No stored results to compare against")
+        path = stored[-1]
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_report(current, baseline=None):
+    header = f"{'scenario':<10} {'count':>6} {'ok':>5} {'p50 ms':>9} {'p95 ms':>9} {'throughput':>18} {'rt/op':>6}"
+    if baseline:
+        header += f" {'p50 vs ' + baseline['label']:>22}"
+    print(header)
+    regressions = []
+    for name, result in current['scenarios'].items():
+        line = (f"{name:<10} {result['count']:>6} {result['ok']:>5} {result.get('p50_ms', 0):>9.1f} "
+                f"{result.get('p95_ms', 0):>9.1f} "
+                f"{str(result.get('throughput', '')) + ' ' + result.get('unit', ''):>18} "
+                f"{result.get('round_trips_per_op', ''):>6}")
+        before = (baseline or {}).get('scenarios', {}).get(name)
+        if before and before.get('p50_ms'):
+            change = (result.get('p50_ms', 0) - before['p50_ms']) / before['p50_ms']
+            line += f" {change:>+21.1%}"
+            if change > REGRESSION_THRESHOLD:
+                regressions.append(name)
+                line += '  ✗'
+        print(line)
+    if regressions:
+        print(f"[!] p50 regressions over {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIO_RUNNERS),
+                        help="Comma-separated subset of " + ', '.join(SCENARIO_RUNNERS))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--chats', type=int, default=5)
+    parser.add_argument('--history', type=int, default=200, help="Messages pre-rendered in every chat")
+    parser.add_argument('--latency-ms', type=int, default=0, help="Delay added to page loads and chat renders")
+    parser.add_argument('--attach-kb', type=int, default=256)
+    parser.add_argument('--label', help="Name of the stored result (default: git describe)")
+    parser.add_argument('--compare', metavar='LABEL', help="Stored result to diff against ('latest' for the newest)")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIO_RUNNERS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    baseline = load_results(args.compare) if args.compare else None
+    current = {
+        'label': args.label or git_label(),
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'params': {k: getattr(args, k) for k in ('iterations', 'chats', 'history', 'latency_ms', 'attach_kb')},
+        'scenarios': run_suite(args),
+    }
+    regressions = print_report(current, baseline)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{current['label']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"[✓] Results saved to {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -2,31 +2,117 @@ import os
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-XPATHS = {
-    'new_chat': '//button[@title="New chat"]',
-    'send_button': '//span[@data-icon="send"]',
-    'attach_button': '//span[@data-icon="plus"]',
-    'file_input': '//input[@type="file"]',
-    'caption_box': '//p[@class="selectable-text copyable-text x15bjb6t x1n2onr6"]',
-    'chat_container': "//div[@class='x1n2onr6 x1vjfegm x1cqoux5 x14yy4lh']",  # Container for chat messages
-    'message_elements': "//div[@class='_akbu']"
+# Ordered locator candidates per element: data-testid, then aria/title, then
+# data-icon, with obfuscated classes only as a last resort. Plain strings are
+# CSS selectors; prefix "xpath:" where XPath is needed (e.g. text matches).
+# src.utils.selectors tries them in order and remembers which one matched.
+SELECTORS = {
+    'qr_canvas': ['canvas[aria-label*="Scan this QR code"]', 'div[data-ref] canvas'],
+    'chat_list_search': ['[data-testid="chat-list-search"]', '#side [role="textbox"][contenteditable="true"]'],
+    'new_chat': ['[data-testid="menu-bar-new-chat"]', 'button[title="New chat"]', '[aria-label="New chat"]',
+                 'span[data-icon="new-chat-outline"]'],
+    'send_button': ['[data-testid="send"]', 'button[aria-label="Send"]', 'span[data-icon="send"]'],
+    'attach_button': ['[data-testid="attach-menu-plus"]', 'button[title="Attach"]', '[aria-label="Attach"]',
+                      'span[data-icon="plus"]', 'span[data-icon="clip"]'],
+    'file_input': ['input[type="file"]'],
+    'caption_box': ['[data-testid="media-caption-input-container"] [contenteditable="true"]',
+                    '[aria-label="Add a caption"][contenteditable="true"]',
+                    'p.selectable-text.copyable-text.x15bjb6t'],
+    'chat_container': ['[data-testid="conversation-panel-messages"]', '#main [role="application"]',
+                       '#main div.x1n2onr6.x1vjfegm.x1cqoux5.x14yy4lh'],  # Container for chat messages
+    'message_box': ['footer [contenteditable="true"][role="textbox"]',
+                    'footer div[contenteditable="true"]'],  # Composer of the open chat
+    'message_row': ['div.copyable-text[data-pre-plain-text]'],  # Message node carrying data-pre-plain-text
+    # "Phone number shared via url is invalid"
+    'invalid_number': ['xpath://div[@role="dialog"][contains(., "invalid")]',
+                       'xpath://div[@data-animate-modal-popup][contains(., "invalid")]'],
+    'chat_search': ['[data-testid="chat-list-search"] [contenteditable="true"]',
+                    '#side [contenteditable="true"][role="textbox"]', '#side div[contenteditable="true"]']
 }
 
 TIMEOUTS = {
-    'qr_scan': 60,  # Increase to 60 seconds
-    'element_wait': 60,
-    'file_upload': 60
+    'qr_scan': 120,  # Whole QR login; the code rotates about every 20s and is redrawn meanwhile
+    'element_wait': 60,  # Opening a chat (page load); the QR screen or an invalid number end it early
+    'action': 10,  # Elements inside an open chat (composer, attach, caption); timeouts are not retried
+    'file_upload': 60,
+    'messages_settle': 2,  # Upper bound for the first message of an opened chat to render
+    'history_page': 5,  # Wait for older messages after scrolling a chat to the top
+    'session_probe': 15,  # Warm start: wait for chat list or QR before falling back
+    'chat_switch': 5,  # In-app chat switch before falling back to a /send URL reload
+    'storage_snapshot': 60
 }
 
 PATHS = {
     'driver': '/usr/bin/chromedriver',  # Path to ChromeDriver
     'cookies': os.path.join(BASE_DIR, 'sessions/cookies.pkl'),  # Cookie path
+    'storage': os.path.join(BASE_DIR, 'sessions/storage.json'),  # localStorage/IndexedDB snapshot
+    'profile': os.path.join(BASE_DIR, 'sessions/profile'),  # Persistent Chrome profile
+    'outbox': os.path.join(BASE_DIR, 'sessions/outbox.jsonl'),  # Persistent send queue
+    'profiles': os.path.join(BASE_DIR, 'sessions/profiles'),  # Per-worker Chrome profiles
+    'messages_db': os.path.join(BASE_DIR, 'sessions/messages.db'),  # Local message history (SQLite)
+    'daemon_socket': os.path.join(BASE_DIR, 'sessions/daemon.sock'),  # --daemon RPC socket
+    'number_cache': os.path.join(BASE_DIR, 'sessions/numbers.json'),  # Known (un)registered numbers
     'media_upload': os.path.join(BASE_DIR, 'media/uploads'),
     'media_download': os.path.join(BASE_DIR, 'media/downloads'),
+    'media_cache': os.path.join(BASE_DIR, 'media/cache'),  # Compressed upload variants, by content hash
+    'metrics': os.path.join(BASE_DIR, 'logs/metrics.json'),  # Periodic metrics dump
+    'log_file': os.path.join(BASE_DIR, 'logs/whatsapp.log'),  # JSON lines, written by a background thread
     'logs': os.path.join(BASE_DIR, 'logs')
 }
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/91.0.4472.124 Safari/537.36"
 WHATSAPP_URL = "https://web.whatsapp.com"
-POLL_INTERVAL = 5
+POLL_INTERVAL = 5  # Back-off after a monitor error
+VIEW_CHUNK_SIZE = 500  # Messages fetched per execute_script when reading a chat
+MONITOR_LONGPOLL = 0.25  # Seconds one monitor drain waits in-page for new messages
+MONITOR_BUFFER_LIMIT = 1000  # Max undrained messages kept in the page
+MONITOR_SEEN_LIMIT = 5000  # Message ids remembered for dedupe (last_messages)
 HEADLESS = True
+PERSIST_PROFILE = True  # Reuse sessions/profile so restarts skip the QR scan
+STORAGE_SNAPSHOT_DATABASES = ['wawc', 'wawc_db_enc', 'signal-storage']  # Auth/key IndexedDBs; chat caches stay out
+LEAN_MODE = True  # Small window, no fonts/sounds/animations; images and media only load while downloading media
+LEAN_BLOCKED_URLS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp3', '*.ogg']  # Always blocked in lean mode
+LEAN_MEDIA_URLS = [  # Blocked in lean mode except during download_media
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*mmg.whatsapp.net/*', '*pps.whatsapp.net/*'
+]
+MEMORY_BUDGET_MB = 1024  # Recycle the browser when its JS heap grows past this; 0 disables the watchdog
+MEMORY_CHECK_INTERVAL = 60  # Seconds between heap checks from the monitor thread
+QR_TERMINAL_INVERT = True  # Draw light QR modules as blocks (dark terminal backgrounds)
+HUMANIZE = False  # Opt-in randomized pauses between actions (human_delay)
+WAIT_STRATEGY = 'observer'  # 'observer' (MutationObserver push) or 'poll' (WebDriverWait)
+NAV_IN_APP = True  # Switch to recently used chats via the chat list instead of reloading the app
+NAV_LRU_SIZE = 50  # Chats remembered for in-app switching
+POOL_SIZE = 1  # Number of browser workers; >1 enables WhatsAppClientPool
+POOL_HEALTH_INTERVAL = 30  # Seconds an idle worker waits before probing its browser
+RETRY_ATTEMPTS = 3  # Tries per send/view/download for transient failures (stale element, slow render)
+RETRY_BACKOFF = 0.5  # Seconds; doubled per retry with full jitter, capped at RETRY_BACKOFF_MAX
+RETRY_BACKOFF_MAX = 8
+OUTBOX_MAX_ATTEMPTS = 5  # Flushes that try a queued item before it is dropped as failed
+BREAKER_THRESHOLD = 5  # Failed operations in a row before the circuit opens and work fails fast
+BREAKER_RESET_TIMEOUT = 60  # Seconds the circuit stays open before one trial operation
+SCHEDULER_ENABLED = True  # Pace batch/daemon sends through src.scheduler.SendScheduler
+SEND_RATE_INITIAL = 0.5  # Account-wide sends/sec the scheduler starts at
+SEND_RATE_MIN = 0.05
+SEND_RATE_MAX = 3.0
+SEND_RATE_INCREASE = 0.02  # Added to the rate after each successful send
+SEND_RATE_DECREASE = 0.5  # Rate multiplier after a failed or timed-out send
+SEND_BURST = 5
+CHAT_RATE = 0.2  # Sends/sec to any single chat
+CHAT_BURST = 3
+ASYNC_CALL_TIMEOUT = 300  # Default seconds an AsyncWhatsAppClient call may wait (queue + run); 0 disables
+DEFAULT_COUNTRY_CODE = ""  # e.g. "91": national numbers (leading 0, or short bare digits) get this code
+NATIONAL_NUMBER_MAX_DIGITS = 10  # Bare digits up to this length have no country code, e.g. "(555) 987-6543"
+NUMBER_CACHE_TTL = 7 * 24 * 3600  # Seconds a registered/unregistered result is trusted
+LOG_LEVEL = 'INFO'  # 'DEBUG' adds per-operation timings; toggle at runtime with the 'debug' command or SIGUSR1
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Size-based rotation of PATHS['log_file']
+LOG_ROTATE_WHEN = None  # e.g. 'midnight' rotates by time instead of size
+LOG_BACKUPS = 5
+METRICS_PORT = None  # e.g. 9464 serves Prometheus text on http://127.0.0.1:<port>/metrics
+METRICS_DUMP_INTERVAL = 0  # Seconds between JSON dumps to PATHS['metrics']; 0 disables
+MEDIA_COMPRESS = True  # Downscale/re-encode images (Pillow) and videos (ffmpeg, if installed) before upload
+MEDIA_IMAGE_MAX_SIDE = 1600
+MEDIA_JPEG_QUALITY = 85
+MEDIA_VIDEO_MAX_SIDE = 1280
+MEDIA_VIDEO_CRF = 28
+MEDIA_WORKERS = 2  # Threads preparing uploads while the chat loads
+MEDIA_DOWNLOAD_MAX_BYTES = 64 * 1024 * 1024  # Per download_media call
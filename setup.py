@@ -11,7 +11,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "whatsapp-cli=src.cli_interface:CLIInterface.start"
+            "whatsapp-cli=src.cli_interface:main"
         ],
     }
 )
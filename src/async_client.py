@@ -0,0 +1,111 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+
+
+class AsyncWhatsAppClient:
+    """asyncio front end for WhatsAppClient / WhatsAppClientPool.
+
+    Calls become jobs on a managed executor: one thread per browser session,
+    not per request. Any number of coroutines can await sends at once, and
+    they queue for the POOL_SIZE browsers. Cancelling a call that is still
+    queued removes it from the queue. A call already running in the browser
+    finishes, but its result is dropped. ``timeout`` (default
+    ASYNC_CALL_TIMEOUT) bounds how long a caller waits, including queueing.
+
+        async with AsyncWhatsAppClient() as client:
+            await client.send_message("+15551234567", "hi", timeout=30)
+            async for message in client.messages():
+                ...
+    """
+
+    def __init__(self, size=None):
+        self.size = size or settings.POOL_SIZE
+        self.backend = None
+        self.executor = None
+
+    async def start(self):
+        """Start the browser(s) without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        if self.size > 1:
+            from src.client_pool import WhatsAppClientPool
+            self.backend = await loop.run_in_executor(None, WhatsAppClientPool, self.size)
+        else:
+            from src.whatsapp_client import WhatsAppClient
+            # A single browser serializes on its lock anyway, so one thread is enough
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='whatsapp')
+            self.backend = await loop.run_in_executor(self.executor, WhatsAppClient)
+        return self
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _submit(self, method, *args):
+        if self.backend is None:
+            raise RuntimeError("AsyncWhatsAppClient is not started; use 'async with' or await start()")
+        if self.executor is None:
+            return self.backend.submit(method, *args)  # Pool job queue
+        return self.executor.submit(getattr(self.backend, method), *args)
+
+    async def call(self, method, *args, timeout=None):
+        """Run a client method as a job and await its result"""
+        future = asyncio.wrap_future(self._submit(method, *args))
+        timeout = settings.ASYNC_CALL_TIMEOUT if timeout is None else timeout
+        return await asyncio.wait_for(future, timeout or None)
+
+    async def send_message(self, number, message, timeout=None):
+        return await self.call('send_message', number, message, timeout=timeout)
+
+    async def send_file(self, number, file_path, caption="", timeout=None):
+        return await self.call('send_file', number, file_path, caption, timeout=timeout)
+
+    async def send_files(self, number, file_paths, caption="", timeout=None):
+        return await self.call('send_files', number, file_paths, caption, timeout=timeout)
+
+    async def view_messages(self, contact_name_or_number, history_pages=0, timeout=None):
+        return await self.call('view_messages', contact_name_or_number, history_pages, timeout=timeout)
+
+    async def download_media(self, contact_name_or_number, limit=20, timeout=None):
+        return await self.call('download_media', contact_name_or_number, limit, timeout=timeout)
+
+    async def messages(self, maxsize=None):
+        """Async iterator over new incoming messages from every browser session.
+
+        Messages are handed over from the monitor thread without blocking it.
+        When the consumer falls more than ``maxsize`` behind (default
+        MONITOR_BUFFER_LIMIT), the oldest messages are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue(maxsize or settings.MONITOR_BUFFER_LIMIT)
+
+        def deliver(message):
+            if inbox.full():
+                inbox.get_nowait()
+            inbox.put_nowait(message)
+
+        def callback(message):
+            loop.call_soon_threadsafe(deliver, message)
+
+        backend = self.backend
+        backend.on_message(callback)
+        try:
+            while True:
+                yield await inbox.get()
+        finally:
+            # Runs when the consumer stops, which may be after close()
+            if callback in backend.message_callbacks:
+                backend.message_callbacks.remove(callback)
+
+    async def close(self):
+        if self.backend is None:
+            return
+        backend, self.backend = self.backend, None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, backend.cleanup)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
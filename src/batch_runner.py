@@ -0,0 +1,221 @@
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import settings
+from src.utils.file_handlers import validate_file_path
+
+
+class BatchRunner:
+    """Run send/attach/view jobs from a JSONL or CSV stream without prompts.
+
+    Jobs are read one at a time and at most ``concurrency`` are in flight,
+    so the input never has to fit in memory. Every finished job is written
+    as one JSON line with its timing. The checkpoint file records how many
+    leading jobs are fully done, and a rerun with the same checkpoint
+    continues from there.
+
+    A job looks like {"op": "send", "to": "alice", "text": "hi"}; attach
+    takes "file" (or a "files" list) and optional "caption", view only "to",
+    download "to" and an optional "limit". With a scheduler, send and
+    attach may also carry "priority" ("transactional" or "bulk", the
+    default) and "at" (epoch seconds) or "delay" (seconds). Scheduled jobs
+    do not hold a worker while they wait in the scheduler, so a deferred
+    job never stalls the ones behind it. CSV input uses the same names as
+    column headers.
+    """
+
+    NUMERIC_CSV_FIELDS = ('at', 'delay')
+
+    def __init__(self, client, contacts, concurrency=None, checkpoint_path=None, scheduler=None):
+        self.client = client
+        self.scheduler = scheduler
+        self.contacts = contacts
+        self.concurrency = max(1, concurrency or settings.POOL_SIZE)
+        self.checkpoint_path = checkpoint_path
+        self.lock = threading.Lock()
+        self.done_offsets = set()
+        self.watermark = 0
+        self.scheduled = set()  # Futures of jobs handed to the scheduler and not finished yet
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('offset', 0)
+
+    def _save_checkpoint(self):
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'offset': self.watermark, 'updated_at': time.time()}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def read_jobs(self, stream, fmt):
+        """Yield (offset, job) pairs lazily from a JSONL or CSV stream"""
+        if fmt == 'csv':
+            for offset, row in enumerate(csv.DictReader(stream)):
+                yield offset, self._csv_job(row)
+            return
+        offset = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                job = {'error': f"Invalid JSON: {e}"}
+            if not isinstance(job, dict):
+                job = {'error': "Job must be a JSON object"}
+            yield offset, job
+            offset += 1
+
+    def _csv_job(self, row):
+        """CSV cells are strings; numeric fields are converted, bad ones fail only this job"""
+        job = {k: v for k, v in row.items() if v not in (None, '')}
+        for field in self.NUMERIC_CSV_FIELDS:
+            if field in job:
+                try:
+                    job[field] = float(job[field])
+                except ValueError:
+                    job['error'] = f"Invalid {field!r}: {job[field]!r} is not a number"
+        return job
+
+    def run_job(self, job, wait=True):
+        """Execute one job and return the fields for its result line.
+
+        With a scheduler and ``wait=False``, send/attach return
+        {'number', 'future'} as soon as the job is queued instead of 'ok'.
+        """
+        if 'error' in job:
+            raise ValueError(job['error'])
+        op = job.get('op')
+        number = self.contacts.get_number(str(job.get('to', '')).strip())
+        if not number:
+            raise ValueError("Job has no recipient ('to')")
+
+        if op == 'send':
+            if self.scheduler:
+                return self._scheduled(number, self._schedule(job, number, text=job.get('text', '')), wait)
+            return {'number': number, 'ok': bool(self.client.send_message(number, job.get('text', '')))}
+        if op == 'attach':
+            files = job.get('files') or [job['file']]
+            for file_path in files:
+                validate_file_path(file_path)
+            if self.scheduler:
+                future = self._schedule(job, number, file_paths=files, caption=job.get('caption', ''))
+                return self._scheduled(number, future, wait)
+            return {'number': number, 'ok': bool(self.client.send_files(number, files, job.get('caption', '')))}
+        if op == 'view':
+            messages = self.client.view_messages(number)
+            return {'number': number, 'ok': messages is not None, 'messages': messages}
+        if op == 'download':
+            files = self.client.download_media(number, int(job.get('limit', 20)))
+            return {'number': number, 'ok': files is not None, 'files': files}
+        raise ValueError(f"Unknown op: {op!r}")
+
+    def _schedule(self, job, number, **send):
+        """Hand a send to the rate-limiting scheduler; returns its Future"""
+        return self.scheduler.submit(number, priority=job.get('priority', 'bulk'), at=job.get('at'),
+                                     delay=job.get('delay'), **send)
+
+    @staticmethod
+    def _scheduled(number, future, wait):
+        if wait:
+            return {'number': number, 'ok': bool(future.result())}
+        return {'number': number, 'future': future}
+
+    def _execute(self, offset, job, emit):
+        started = time.time()
+        start = time.perf_counter()
+        result = {'offset': offset}
+        try:
+            # Inside the guard: a bad job must still produce a result line, or the checkpoint stalls
+            result.update({'id': job.get('id'), 'op': job.get('op'), 'to': job.get('to')})
+            result.update(self.run_job(job, wait=False))
+            result['error'] = None
+        except Exception as e:
+            result.update({'ok': False, 'error': str(e)})
+        future = result.pop('future', None)
+        if future is None:
+            self._finish(offset, result, started, start, emit)
+            return
+        # Collected when the scheduler is done with it; this worker moves on to the next job
+        with self.lock:
+            self.scheduled.add(future)
+        future.add_done_callback(lambda f: self._finish_scheduled(f, offset, result, started, start, emit))
+
+    def _finish_scheduled(self, future, offset, result, started, start, emit):
+        try:
+            result['ok'] = bool(future.result())
+        except Exception as e:
+            result.update({'ok': False, 'error': str(e)})
+        self._finish(offset, result, started, start, emit)
+        with self.lock:
+            self.scheduled.discard(future)
+
+    def _finish(self, offset, result, started, start, emit):
+        result['started_at'] = started
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        emit(result)
+
+        with self.lock:
+            self.done_offsets.add(offset)
+            advanced = False
+            while self.watermark in self.done_offsets:
+                self.done_offsets.remove(self.watermark)
+                self.watermark += 1
+                advanced = True
+            if advanced and self.checkpoint_path:
+                self._save_checkpoint()
+
+    def run(self, source='-', results_path=None, fmt=None, results_stream=None):
+        """Process every job in ``source`` ('-' for stdin); returns (ok, failed) counts
+
+        Results go to ``results_path`` when given, else to ``results_stream``
+        (default sys.stdout).
+        """
+        fmt = fmt or ('csv' if str(source).lower().endswith('.csv') else 'jsonl')
+        skip = self.watermark = self.load_checkpoint()
+        if skip:
+            print(f"[•] Resuming after {skip} completed jobs", file=sys.stderr)
+
+        stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8', newline='')
+        default_out = results_stream or sys.stdout
+        out = default_out if not results_path else open(results_path, 'a' if skip else 'w', encoding='utf-8')
+        out_lock = threading.Lock()
+        counts = {'ok': 0, 'failed': 0}
+
+        def emit(result):
+            with out_lock:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                counts['ok' if result['ok'] else 'failed'] += 1
+
+        # The semaphore caps queued work, so reading stays one step ahead of the workers
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+
+        def release(_):
+            slots.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for offset, job in self.read_jobs(stream, fmt):
+                    if offset < skip:
+                        continue
+                    slots.acquire()
+                    executor.submit(self._execute, offset, job, emit).add_done_callback(release)
+            with self.lock:
+                scheduled = list(self.scheduled)
+            wait(scheduled)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if out is not default_out:
+                out.close()
+
+        print(f"[✓] Batch finished: {counts['ok']} ok, {counts['failed']} failed", file=sys.stderr)
+        return counts['ok'], counts['failed']
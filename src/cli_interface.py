@@ -1,31 +1,41 @@
-from src.whatsapp_client import WhatsAppClient
+from config import settings
 from src.utils.file_handlers import validate_file_path
+from src.utils.message_store import MessageStore
+from src.utils.contact_store import ContactStore
+from src.utils.vcf import iter_vcf_contacts, write_vcf
+from src.utils.phone import InvalidNumberError, to_e164
+from src.utils.metrics import format_summary, metrics, start_exporters
+from src.utils.error_handlers import FatalError
+from src.utils.log import setup_logging, toggle_debug
+import argparse
+import contextlib
 import readline
-import json
+import sys
 import os
-import vobject  # For parsing and creating .vcf files
+import time
 
 class ContactManager:
     def __init__(self):
         self.contacts_file = os.path.expanduser("~/.whatsapp_contacts.json")
-        self.contacts = self._load_contacts()
-
-    def _load_contacts(self):
-        if os.path.exists(self.contacts_file):
-            with open(self.contacts_file, 'r') as f:
-                return json.load(f)
-        return {}
-
-    def _save_contacts(self):
-        with open(self.contacts_file, 'w') as f:
-            json.dump(self.contacts, f, indent=2)
+        self.store = ContactStore(self.contacts_file)
+        self.contacts = self.store.contacts
 
     def add_contact(self, name, number):
-        self.contacts[name.lower()] = number
-        self._save_contacts()
+        """Save a contact under its E.164 number; raises InvalidNumberError for bad numbers."""
+        self.store.set(name.lower(), to_e164(number))
 
     def get_number(self, input_str):
-        return self.contacts.get(input_str.lower(), input_str)
+        query = input_str.strip()
+        if not any(c.isalpha() for c in query):
+            try:
+                return to_e164(query)  # Already a phone number
+            except InvalidNumberError:
+                return query  # Rejected by the client before opening the browser
+        return self.store.lookup(query.lower()) or input_str
+
+    def find_contacts(self, number):
+        """Names saved for a phone number, whatever its formatting."""
+        return self.store.names_for_number(number)
 
     def list_contacts(self):
         return self.contacts.items()
@@ -33,45 +43,49 @@ class ContactManager:
     def delete_contact(self, name):
         """Delete a contact by name."""
         name = name.lower()
-        if name in self.contacts:
-            del self.contacts[name]
-            self._save_contacts()
-            return True
-        return False
+        return self.store.delete(name)
 
     def import_contacts_from_vcf(self, vcf_file_path):
-        """Import contacts from a .vcf file."""
+        """Import contacts from a .vcf file, keeping every phone number.
+
+        The first number is saved under the contact's name and each further
+        one as "name (type)", e.g. "alice (work)", or "alice (2)" when the
+        card gives no type.
+        """
         if not os.path.exists(vcf_file_path):
             print(f"✗ File '{vcf_file_path}' not found.")
             return False
 
         try:
-            with open(vcf_file_path, 'r', encoding='utf-8') as f:
-                vcf_data = f.read()
-
-            # Parse the .vcf file
-            vcard_list = vobject.readComponents(vcf_data)
+            start = time.perf_counter()
             imported_count = 0
+            invalid_count = 0
+            cards = 0
 
-            for vcard in vcard_list:
-                try:
-                    name = vcard.fn.value
-                    number = None
-
-                    # Extract the first phone number
-                    if hasattr(vcard, 'tel'):
-                        number = vcard.tel.value
-                        if number.startswith('+'):
-                            number = number.replace(' ', '')  # Normalize the number
-
-                    if name and number:
-                        self.add_contact(name, number)
+            with self.store.batch():  # One atomic journal commit and fsync for the whole file
+                for name, numbers in iter_vcf_contacts(vcf_file_path):
+                    cards += 1
+                    if not name or not numbers:
+                        continue
+                    seen = set()
+                    for index, (number, kind) in enumerate(numbers):
+                        if number in seen:
+                            continue
+                        seen.add(number)
+                        key = name if len(seen) == 1 else f"{name} ({kind or index + 1})"
+                        try:
+                            self.add_contact(key, number)
+                        except InvalidNumberError:
+                            invalid_count += 1
+                            continue
                         imported_count += 1
-                except Exception as e:
-                    print(f"✗ Error processing contact: {e}")
-                    continue
 
-            print(f"✓ Imported {imported_count} contacts from '{vcf_file_path}'.")
+            elapsed = time.perf_counter() - start
+            rate = cards / elapsed if elapsed else 0
+            print(f"✓ Imported {imported_count} numbers from {cards} contacts in '{vcf_file_path}' "
+                  f"({rate:.0f} records/sec).")
+            if invalid_count:
+                print(f"✗ Skipped {invalid_count} invalid numbers (set DEFAULT_COUNTRY_CODE for national numbers).")
             return True
 
         except Exception as e:
@@ -81,16 +95,12 @@ class ContactManager:
     def export_contacts_to_vcf(self, vcf_file_path):
         """Export contacts to a .vcf file."""
         try:
-            with open(vcf_file_path, 'w', encoding='utf-8') as f:
-                for name, number in self.contacts.items():
-                    # Create a vCard object
-                    vcard = vobject.vCard()
-                    vcard.add('fn').value = name  # Full name
-                    vcard.add('tel').value = number  # Phone number
-                    f.write(vcard.serialize())
-                    f.write("\n")  # Add a newline between vCards
-
-            print(f"✓ Exported {len(self.contacts)} contacts to '{vcf_file_path}'.")
+            start = time.perf_counter()
+            with self.store.lock:
+                count = write_vcf(vcf_file_path, self.contacts.items())
+            elapsed = time.perf_counter() - start
+            rate = count / elapsed if elapsed else 0
+            print(f"✓ Exported {count} contacts to '{vcf_file_path}' ({rate:.0f} records/sec).")
             return True
 
         except Exception as e:
@@ -98,19 +108,39 @@ class ContactManager:
             return False
 
 class CLIInterface:
-    def __init__(self):
-        self.client = WhatsAppClient()
+    def __init__(self, remote=False):
+        self.remote = remote
+        self._client = None
         self.contacts = ContactManager()
+        self.store = MessageStore(settings.PATHS['messages_db'])
+
+    @property
+    def client(self):
+        """Browser client, started on the first command that needs it."""
+        if self._client is None:
+            # Selenium is imported here so contact and search commands stay fast
+            if self.remote:
+                from src.daemon import DaemonClient
+                self._client = DaemonClient()
+            elif settings.POOL_SIZE > 1:
+                from src.client_pool import WhatsAppClientPool
+                self._client = WhatsAppClientPool()
+            else:
+                from src.whatsapp_client import WhatsAppClient
+                self._client = WhatsAppClient()
+        return self._client
         
     def start(self):
         try:
             while True:
-                cmd = input("\nCommand [send/attach/add/list/delete/import/export/view/exit]: ").strip().lower()
+                cmd = input("\nCommand [send/attach/download/add/list/delete/import/export/view/search/stats/debug/exit]: ").strip().lower()
                 
                 if cmd == "send":
                     self.handle_message()
                 elif cmd == "attach":
                     self.handle_attachment()
+                elif cmd == "download":
+                    self.handle_download_media()
                 elif cmd == "add":
                     self.handle_add_contact()
                 elif cmd == "list":
@@ -123,11 +153,18 @@ class CLIInterface:
                     self.handle_export_contacts()
                 elif cmd == "view":
                     self.handle_view_messages()
+                elif cmd == "search":
+                    self.handle_search_messages()
+                elif cmd == "stats":
+                    self.handle_stats()
+                elif cmd == "debug":
+                    self.handle_debug()
                 elif cmd == "exit":
                     break
                     
         finally:
-            self.client.cleanup()
+            if self._client is not None:
+                self._client.cleanup()
 
     def handle_message(self):
         identifier = input("Contact name or phone number (+format): ").strip()
@@ -139,16 +176,31 @@ class CLIInterface:
     def handle_attachment(self):
         identifier = input("Contact name or phone number (+format): ").strip()
         number = self.contacts.get_number(identifier)
-        file_path = input("File path: ").strip()
-        if validate_file_path(file_path):
+        entered = input("File path(s), comma-separated: ").strip()
+        file_paths = [entered] if os.path.exists(entered) else [p.strip() for p in entered.split(",") if p.strip()]
+        if all(validate_file_path(file_path) for file_path in file_paths):
             caption = input("Caption (optional): ").strip()
-            if self.client.send_file(number, file_path, caption):
-                print("✓ File sent")
+            if self.client.send_files(number, file_paths, caption):
+                print(f"✓ {len(file_paths)} file(s) sent")
+
+    def handle_download_media(self):
+        """Save images and videos from a chat to media/downloads."""
+        identifier = input("Enter contact name or phone number (+format): ").strip()
+        saved = self.client.download_media(self.contacts.get_number(identifier))
+        if saved is None:
+            print("✗ Failed to download media")
+            return
+        for path in saved:
+            print(f"  {path}")
 
     def handle_add_contact(self):
         name = input("Contact name: ").strip()
         number = input("Phone number (+country code): ").strip()
-        self.contacts.add_contact(name, number)
+        try:
+            self.contacts.add_contact(name, number)
+        except InvalidNumberError as e:
+            print(f"✗ {e}")
+            return
         print(f"✓ Contact '{name}' added")
 
     def handle_list_contacts(self):
@@ -179,11 +231,89 @@ class CLIInterface:
         """Handle viewing messages for a contact."""
         identifier = input("Enter contact name or phone number (+format): ").strip()
         number = self.contacts.get_number(identifier)
-        if self.client.view_messages(number):
-            print("✓ Messages displayed")
-        else:
+        messages = self.client.view_messages(number)
+        if messages is None:
             print("✗ Failed to view messages")
+            return
+        print(f"\nMessages with {identifier}:")
+        for message in messages:
+            print(f"  [{message['timestamp']}] {message['sender']}: {message['text']}")
+        print(f"✓ {len(messages)} messages displayed")
+
+    def handle_search_messages(self):
+        """Search the local message history."""
+        query = input("Search text: ").strip()
+        results = self.store.search(query)
+        if not results:
+            print("✗ No matching messages")
+            return
+        for message in results:
+            print(f"  {message['chat']} [{message['timestamp']}] {message['sender']}: {message['text']}")
+        print(f"✓ {len(results)} matches")
+
+    def handle_stats(self):
+        """Summarize timings and counters (from the daemon with --remote)."""
+        if self.remote:
+            snapshot = self.client.stats()
+        else:
+            snapshot = metrics.snapshot()
+        if not snapshot:
+            print("✗ No statistics available")
+            return
+        print(format_summary(snapshot))
+
+    def handle_debug(self):
+        """Toggle DEBUG logging (in the daemon with --remote)."""
+        level = self.client.set_log_level() if self.remote else toggle_debug()
+        print(f"✓ Log level: {level}")
+
+    def run_batch(self, source, results_path=None, checkpoint_path=None, concurrency=None, fmt=None):
+        """Run a job file non-interactively (see src.batch_runner)."""
+        from src.batch_runner import BatchRunner
+
+        results_stream = sys.stdout
+        # Status prints go to stderr so they cannot corrupt a JSONL result stream on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            scheduler = None
+            if settings.SCHEDULER_ENABLED and not self.remote:  # The daemon paces its own sends
+                from src.scheduler import SendScheduler
+                scheduler = SendScheduler(self.client)
+            runner = BatchRunner(self.client, self.contacts, concurrency, checkpoint_path, scheduler)
+            try:
+                return runner.run(source, results_path, fmt, results_stream)
+            finally:
+                if scheduler:
+                    print(f"[•] Scheduler: {scheduler.stats()}")
+                    scheduler.close()
+                self.client.cleanup()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WhatsApp CLI")
+    parser.add_argument("--batch", metavar="FILE", help="Run jobs from a JSONL/CSV file ('-' for stdin)")
+    parser.add_argument("--results", metavar="FILE", help="Write JSONL results here instead of stdout")
+    parser.add_argument("--checkpoint", metavar="FILE", help="Resume from and record progress in this file")
+    parser.add_argument("--concurrency", type=int, help="Jobs in flight at once (default: POOL_SIZE)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Job file format (default: by extension)")
+    parser.add_argument("--daemon", action="store_true", help="Keep a warm browser running behind a local socket")
+    parser.add_argument("--remote", action="store_true", help="Send browser commands to the running daemon")
+    args = parser.parse_args(argv)
+    setup_logging()
+    start_exporters()
+
+    try:
+        if args.daemon:
+            from src.daemon import WhatsAppDaemon
+            WhatsAppDaemon().serve_forever()
+            return 0
+
+        interface = CLIInterface(remote=args.remote)
+        if args.batch:
+            _, failed = interface.run_batch(args.batch, args.results, args.checkpoint, args.concurrency, args.format)
+            return 1 if failed else 0
+        interface.start()
+        return 0
+    except FatalError:
+        return 1  # Already reported by handle_error
 
 if __name__ == "__main__":
-    interface = CLIInterface()
-    interface.start()
+    raise SystemExit(main())
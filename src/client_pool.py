@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from config import settings
+from src.utils.error_handlers import handle_error
+from src.whatsapp_client import WhatsAppClient
+
+READ_ONLY_METHODS = ('view_messages', 'download_media')  # Safe to run again after a browser crash
+
+
+class WhatsAppClientPool:
+    """Run several WhatsAppClient browsers and route jobs to whichever is free.
+
+    Exposes the same blocking send_message/send_file(s)/view_messages/download_media/cleanup
+    API as WhatsAppClient, plus submit() for callers that want a Future.
+    Each worker owns a separate Chrome profile directory so its linked
+    session survives restarts, and a worker whose browser stops answering is
+    replaced with a fresh one.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or settings.POOL_SIZE
+        self.jobs = queue.Queue()
+        self.running = True
+        self.clients = [None] * self.size
+        self.clients_lock = threading.Lock()
+        self.live_workers = self.size
+        self.message_callbacks = []
+        self.threads = []
+        for index in range(self.size):
+            thread = threading.Thread(target=self._worker, args=(index,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _spawn_client(self, index):
+        profile_dir = os.path.join(settings.PATHS['profiles'], f"worker-{index}")
+        client = WhatsAppClient(
+            profile_dir=profile_dir,
+            cookies_path=os.path.join(profile_dir, 'cookies.pkl'),
+            outbox_path=os.path.join(profile_dir, 'outbox.jsonl'),
+            storage_path=os.path.join(profile_dir, 'storage.json')
+        )
+        client.on_message(self._dispatch_message)
+        with self.clients_lock:
+            self.clients[index] = client
+        print(f"[✓] Pool worker {index} ready")
+        return client
+
+    def _replace_client(self, index, client):
+        print(f"[!] Pool worker {index} browser unresponsive, restarting")
+        try:
+            client.cleanup()
+        except Exception:
+            pass  # Browser is already gone
+        return self._spawn_client(index)
+
+    def _worker(self, index):
+        try:
+            client = self._spawn_client(index)
+        except Exception as e:
+            handle_error(f"Pool worker {index} failed to start: {e}")
+            with self.clients_lock:
+                self.live_workers -= 1
+                if self.live_workers == 0:
+                    self._fail_pending()
+            return
+
+        while self.running:
+            try:
+                job = self.jobs.get(timeout=settings.POOL_HEALTH_INTERVAL)
+            except queue.Empty:
+                if not client.is_alive():
+                    try:
+                        client = self._replace_client(index, client)
+                    except Exception as e:
+                        handle_error(f"Pool worker {index} restart failed: {e}")  # Retried on next probe
+                continue
+            if job is None:
+                break
+
+            method, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = getattr(client, method)(*args)
+                if not result and not client.is_alive():
+                    # The browser died under the job; retry it once on a fresh one unless a
+                    # send already pressed the button (attempt is per thread, so it is this job's)
+                    committed = getattr(client.attempt, 'committed', False)
+                    client = self._replace_client(index, client)
+                    if method in READ_ONLY_METHODS or not committed:
+                        result = getattr(client, method)(*args)
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+
+        try:
+            client.cleanup()
+        except Exception:
+            pass
+
+    def _fail_pending(self):
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job[2].set_exception(RuntimeError("No pool workers are running"))
+
+    def _dispatch_message(self, message):
+        for callback in list(self.message_callbacks):
+            try:
+                callback(message)
+            except Exception as e:
+                handle_error(f"Message callback failed: {str(e)}")
+
+    def on_message(self, callback):
+        """Call callback(message) for new incoming messages seen by any worker"""
+        self.message_callbacks.append(callback)
+        return callback
+
+    def submit(self, method, *args):
+        """Queue a client method call and return a Future for its result"""
+        future = Future()
+        with self.clients_lock:
+            if self.live_workers == 0:
+                future.set_exception(RuntimeError("No pool workers are running"))
+                return future
+            self.jobs.put((method, args, future))
+        return future
+
+    def send_message(self, number, message):
+        return self.submit('send_message', number, message).result()
+
+    def send_file(self, number, file_path, caption=""):
+        return self.submit('send_file', number, file_path, caption).result()
+
+    def send_files(self, number, file_paths, caption=""):
+        return self.submit('send_files', number, file_paths, caption).result()
+
+    def download_media(self, contact_name_or_number, limit=20):
+        return self.submit('download_media', contact_name_or_number, limit).result()
+
+    def view_messages(self, contact_name_or_number, history_pages=0):
+        return self.submit('view_messages', contact_name_or_number, history_pages).result()
+
+    def cleanup(self):
+        self.running = False
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
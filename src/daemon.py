@@ -0,0 +1,242 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+from config import settings
+from src.batch_runner import BatchRunner
+from src.utils.error_handlers import handle_error
+from src.utils.log import set_level, toggle_debug
+from src.utils.message_store import MessageStore
+from src.utils.metrics import metrics
+
+
+class WhatsAppDaemon:
+    """Long-running owner of a warm browser session, served over a Unix socket.
+
+    The protocol is one JSON object per line in each direction, and a
+    connection may carry any number of requests. Requests use the batch
+    job shape ({"op": "send", "to": ..., "text": ...}) plus "search"
+    (query, chat, limit), "stats", "log_level" (level, or toggle DEBUG when
+    omitted) and "ping". Every reply has ok, error and
+    elapsed_ms.
+    """
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or settings.PATHS['daemon_socket']
+        self.started_at = time.time()
+
+        # Deferred so importing this module does not pull in selenium
+        if settings.POOL_SIZE > 1:
+            from src.client_pool import WhatsAppClientPool
+            self.client = WhatsAppClientPool()
+        else:
+            from src.whatsapp_client import WhatsAppClient
+            self.client = WhatsAppClient()
+        from src.cli_interface import ContactManager
+        self.contacts = ContactManager()
+        self.store = MessageStore(settings.PATHS['messages_db'])
+        self.scheduler = None
+        if settings.SCHEDULER_ENABLED:
+            from src.scheduler import SendScheduler
+            self.scheduler = SendScheduler(self.client)
+        self.runner = BatchRunner(self.client, self.contacts, scheduler=self.scheduler)
+
+    def handle(self, request):
+        op = request.get('op')
+        if op == 'ping':
+            return {'pid': os.getpid(), 'uptime': time.time() - self.started_at}
+        if op == 'stats':
+            stats = metrics.snapshot()
+            if self.scheduler:
+                stats['scheduler'] = self.scheduler.stats()
+            return {'stats': stats}
+        if op == 'log_level':
+            level = request.get('level')
+            return {'level': set_level(level.upper()) if level else toggle_debug()}
+        if op == 'search':
+            return {'messages': self.store.search(request.get('query', ''), request.get('chat'),
+                                                  request.get('limit', 20))}
+        result = self.runner.run_job(request)
+        if not result.get('ok'):
+            result['error'] = f"{op} failed"
+        return result
+
+    def _reply(self, request):
+        start = time.perf_counter()
+        try:
+            response = {'ok': True, 'error': None}
+            response.update(self.handle(request))
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return response
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            if DaemonClient(self.socket_path).is_running():
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.remove(self.socket_path)  # Stale socket from a crashed daemon
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+
+        previous_umask = os.umask(0o177)  # Socket is only usable by this user
+        try:
+            server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(previous_umask)
+        server.daemon_threads = True
+        server.daemon = self
+
+        def stop(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        print(f"[✓] Daemon listening on {self.socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            if self.scheduler:
+                self.scheduler.close()
+            self.client.cleanup()
+            self.store.close()
+            print("[✓] Daemon stopped")
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """One connection: a JSON request per line in, a JSON reply per line out (server.daemon answers)"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {'ok': False, 'error': f"Invalid JSON: {e}", 'elapsed_ms': 0}
+            else:
+                response = self.server.daemon._reply(request)
+            try:
+                data = json.dumps(response)
+            except (TypeError, ValueError) as e:
+                # The request already ran; report it instead of dropping the connection
+                data = json.dumps({'ok': False, 'error': f"Could not encode reply: {e}",
+                                   'elapsed_ms': response.get('elapsed_ms', 0)})
+            self.wfile.write((data + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+
+class DaemonClient:
+    """Thin client for WhatsAppDaemon exposing the WhatsAppClient call API.
+
+    It can stand in for a client in CLIInterface and BatchRunner. The one
+    socket connection is reused for all calls and reopened if it drops. A
+    request is only sent again when a reused connection turns out to be
+    dead before it was delivered, and sends are never replayed: once a
+    request is out, a lost reply raises instead of risking a duplicate.
+    """
+
+    UNSAFE_TO_REPLAY = ('send', 'attach')
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or settings.PATHS['daemon_socket']
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+
+    def _connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+        self.reader = self.sock.makefile('r', encoding='utf-8')
+
+    def _close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+        self.sock = self.reader = None
+
+    def _stale(self):
+        """True when the daemon closed the reused connection (e.g. it was restarted)"""
+        self.sock.setblocking(False)
+        try:
+            return self.sock.recv(1, socket.MSG_PEEK) == b''
+        except BlockingIOError:
+            return False  # Open, nothing pending
+        except OSError:
+            return True
+        finally:
+            self.sock.setblocking(True)
+
+    def request(self, op, **fields):
+        payload = (json.dumps(dict(fields, op=op)) + "\n").encode('utf-8')
+        with self.lock:
+            if self.sock is not None and self._stale():
+                self._close()
+            reused = self.sock is not None
+            try:
+                if self.sock is None:
+                    self._connect()
+                self.sock.sendall(payload)
+            except OSError:
+                self._close()
+                if not reused or op in self.UNSAFE_TO_REPLAY:
+                    raise
+                self._connect()  # Reused socket died under us before the request went out
+                self.sock.sendall(payload)
+            try:
+                line = self.reader.readline()
+                if not line:
+                    raise ConnectionError("Daemon closed the connection")
+                return json.loads(line)
+            except (OSError, ValueError):
+                self._close()  # The daemon may have acted on it; never resend
+                raise
+
+    def is_running(self):
+        try:
+            return self.request('ping')['ok']
+        except OSError:
+            return False
+
+    def send_message(self, number, message):
+        return self._call('send', to=number, text=message)['ok']
+
+    def send_file(self, number, file_path, caption=""):
+        return self.send_files(number, [file_path], caption)
+
+    def send_files(self, number, file_paths, caption=""):
+        # The daemon may run from another directory
+        files = [os.path.abspath(path) if os.path.exists(path) else path for path in file_paths]
+        return self._call('attach', to=number, files=files, caption=caption)['ok']
+
+    def view_messages(self, contact_name_or_number, history_pages=0):
+        response = self._call('view', to=contact_name_or_number)
+        return response.get('messages') if response['ok'] else None
+
+    def download_media(self, contact_name_or_number, limit=20):
+        response = self._call('download', to=contact_name_or_number, limit=limit)
+        return response.get('files') if response['ok'] else None
+
+    def search(self, query, chat=None, limit=20):
+        return self._call('search', query=query, chat=chat, limit=limit).get('messages', [])
+
+    def stats(self):
+        return self._call('stats').get('stats')
+
+    def set_log_level(self, level=None):
+        """Set the daemon's log level, or toggle DEBUG when ``level`` is None"""
+        return self._call('log_level', level=level).get('level')
+
+    def _call(self, op, **fields):
+        response = self.request(op, **fields)
+        if not response['ok']:
+            handle_error(f"Daemon {op} failed: {response['error']}")
+        return response
+
+    def cleanup(self):
+        with self.lock:
+            self._close()
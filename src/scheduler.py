@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import settings
+from src.utils.error_handlers import handle_error
+from src.utils.log import log_context
+from src.utils.metrics import metrics
+from src.utils.phone import InvalidNumberError, check_number, get_number_cache
+
+PRIORITIES = ('transactional', 'bulk')  # Dispatch order: all due transactional sends go first
+
+
+class TokenBucket:
+    """Classic token bucket; ``rate`` tokens per second up to ``burst``"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self, now):
+        """Seconds until one token is available (0 when it is now)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class SendScheduler:
+    """Rate-limited, prioritized dispatcher in front of send_message/send_files.
+
+    A global token bucket caps the account's send rate. Its rate adapts
+    AIMD-style: each success adds SEND_RATE_INCREASE up to SEND_RATE_MAX,
+    and each failure or timeout multiplies it by SEND_RATE_DECREASE. A
+    per-chat bucket (CHAT_RATE, CHAT_BURST) keeps one busy recipient from
+    hogging the account. Chats of the same priority are served
+    round-robin. Sends can be deferred with ``at`` (epoch seconds) or
+    ``delay``. Failures caused by the recipient (a malformed or
+    unregistered number) do not slow the rate down.
+    """
+
+    def __init__(self, client, workers=None):
+        self.client = client
+        self.rate = TokenBucket(settings.SEND_RATE_INITIAL, settings.SEND_BURST)
+        self.chat_buckets = OrderedDict()
+        self.ready = {priority: OrderedDict() for priority in PRIORITIES}  # chat -> deque of jobs
+        self.deferred = []  # heap of (due, seq, job)
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.workers = workers or settings.POOL_SIZE
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scheduler')
+        self.counts = {'sent': 0, 'failed': 0, 'rejected': 0}
+        self.running = True
+        self.thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, number, text=None, file_paths=None, caption="", priority='bulk', at=None, delay=None):
+        """Schedule a text or file send; returns a Future resolving to True/False"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}, expected one of {PRIORITIES}")
+        future = Future()
+        try:
+            chat = check_number(number)  # Bad recipients never occupy the queue
+        except InvalidNumberError as e:
+            handle_error(f"Send rejected: {str(e)}")
+            with self.condition:
+                self.counts['rejected'] += 1
+            future.set_result(False)
+            return future
+        job = {'number': number, 'chat': chat, 'text': text, 'file_paths': file_paths,
+               'caption': caption, 'priority': priority, 'future': future}
+        due = at if at is not None else time.time() + (delay or 0)
+        with self.condition:
+            if due > time.time():
+                heapq.heappush(self.deferred, (due, next(self.counter), job))
+            else:
+                self._enqueue(job)
+            self.condition.notify()
+        return future
+
+    def send_message(self, number, message, priority='transactional'):
+        """Blocking drop-in for client.send_message, paced by the scheduler"""
+        return self.submit(number, text=message, priority=priority).result()
+
+    def send_files(self, number, file_paths, caption="", priority='transactional'):
+        return self.submit(number, file_paths=file_paths, caption=caption, priority=priority).result()
+
+    def _enqueue(self, job):
+        self.ready[job['priority']].setdefault(job['chat'], deque()).append(job)
+
+    def _chat_bucket(self, chat):
+        bucket = self.chat_buckets.get(chat)
+        if bucket is None:
+            bucket = self.chat_buckets[chat] = TokenBucket(settings.CHAT_RATE, settings.CHAT_BURST)
+            if len(self.chat_buckets) > settings.MONITOR_SEEN_LIMIT:
+                self.chat_buckets.popitem(last=False)  # Forget the least recently used chat
+        else:
+            self.chat_buckets.move_to_end(chat)
+        return bucket
+
+    def _next_job(self, now):
+        """Pop the next dispatchable job, or return the seconds to wait for one"""
+        wait = None
+        while self.deferred and self.deferred[0][0] <= time.time():
+            self._enqueue(heapq.heappop(self.deferred)[2])
+        if self.deferred:
+            wait = self.deferred[0][0] - time.time()
+        if self.in_flight >= self.workers:
+            return None, wait
+
+        global_wait = self.rate.ready_in(now)
+        for priority in PRIORITIES:
+            chats = self.ready[priority]
+            for chat in list(chats):
+                chat_wait = self._chat_bucket(chat).ready_in(now)
+                if chat_wait or global_wait:
+                    delay = max(chat_wait, global_wait)
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+                queue = chats.pop(chat)
+                job = queue.popleft()
+                if queue:
+                    chats[chat] = queue  # Back of the line: round-robin across chats
+                self.rate.take(now)
+                self._chat_bucket(chat).take(now)
+                return job, None
+        return None, wait
+
+    def _dispatch_loop(self):
+        with self.condition:
+            while self.running:
+                job, wait = self._next_job(time.monotonic())
+                if job is None:
+                    self.condition.wait(timeout=wait)
+                    continue
+                self.in_flight += 1
+                self.executor.submit(self._run, job)
+
+    def _run(self, job):
+        start = time.perf_counter()
+        try:
+            with log_context(chat=job['chat'], priority=job['priority']):
+                if job['file_paths']:
+                    ok = bool(self.client.send_files(job['number'], job['file_paths'], job['caption']))
+                else:
+                    ok = bool(self.client.send_message(job['number'], job['text'] or ""))
+            error = None
+        except Exception as e:
+            ok, error = False, e
+        metrics.observe('scheduler_send_seconds', time.perf_counter() - start, priority=job['priority'])
+
+        with self.condition:
+            self.in_flight -= 1
+            if ok:
+                self.counts['sent'] += 1
+                self.rate.rate = min(settings.SEND_RATE_MAX, self.rate.rate + settings.SEND_RATE_INCREASE)
+            elif get_number_cache().status(job['chat']) is False:
+                self.counts['rejected'] += 1  # Recipient problem, not throttling
+            else:
+                self.counts['failed'] += 1
+                self.rate.rate = max(settings.SEND_RATE_MIN, self.rate.rate * settings.SEND_RATE_DECREASE)
+            metrics.inc('scheduler_sends_total', status='ok' if ok else 'failed', priority=job['priority'])
+            self.condition.notify()
+
+        if error is not None:
+            job['future'].set_exception(error)
+        else:
+            job['future'].set_result(ok)
+
+    def stats(self):
+        """Current rate and queue depths"""
+        with self.condition:
+            return {
+                'rate_per_sec': round(self.rate.rate, 3),
+                'in_flight': self.in_flight,
+                'queued': {priority: sum(len(q) for q in chats.values()) for priority, chats in self.ready.items()},
+                'deferred': len(self.deferred),
+                'chats_waiting': sum(len(chats) for chats in self.ready.values()),
+                **self.counts
+            }
+
+    def close(self, wait=True):
+        """Stop dispatching; queued and deferred sends are cancelled"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+            pending = [job for chats in self.ready.values() for q in chats.values() for job in q]
+            pending += [job for _, _, job in self.deferred]
+            for chats in self.ready.values():
+                chats.clear()
+            self.deferred.clear()
+        for job in pending:
+            job['future'].cancel()
+        self.thread.join()
+        self.executor.shutdown(wait=wait)
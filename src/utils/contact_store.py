@@ -0,0 +1,203 @@
+import bisect
+import difflib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from src.utils.phone import normalize_number
+
+
+class ContactStore:
+    """Name -> number map persisted as a JSON snapshot plus an append-only journal.
+
+    Each change is appended to ``<path>.journal``. Changes made inside
+    ``batch()`` are streamed to the journal between ``begin`` and
+    ``commit`` markers and fsync'ed once, when the batch exits. Replay
+    ignores a batch without its commit, so a crash mid-import leaves none
+    of it behind, and a huge import never has to sit in memory. When the
+    journal gets long, it is folded into the snapshot, which is replaced
+    atomically, so a crash never leaves a half-written contacts file.
+    The snapshot keeps the original ``~/.whatsapp_contacts.json`` format.
+    """
+
+    def __init__(self, path, compact_threshold=1000):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()
+        self.contacts = {}
+        self._by_number = None  # normalized number -> set of names, built on first use
+        self._sorted_names = None  # Rebuilt lazily for prefix lookups
+        self._batch_file = None  # Journal opened by the current batch()
+        self._batch_entries = 0
+        self._journal_entries = 0
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.contacts = json.load(f)
+        if os.path.exists(self.journal_path):
+            offset = valid_bytes = 0
+            batch = None  # Entries of a batch whose commit has not been read yet
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn tail of an interrupted write
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    if entry['op'] == 'begin':
+                        batch = []
+                    elif entry['op'] == 'commit':
+                        for change in batch or ():
+                            self._apply(change)
+                        batch = None
+                    elif batch is not None:
+                        batch.append(entry)
+                    else:
+                        self._apply(entry)
+                    if batch is None:
+                        valid_bytes = offset
+            if valid_bytes < os.path.getsize(self.journal_path):
+                # Drop the torn tail or uncommitted batch so later appends start clean
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+    def _apply(self, entry):
+        self._journal_entries += 1
+        if entry['op'] == 'set':
+            self.contacts[entry['name']] = entry['number']
+        elif entry['op'] == 'del':
+            self.contacts.pop(entry['name'], None)
+
+    @property
+    def by_number(self):
+        with self.lock:
+            if self._by_number is None:
+                index = {}
+                for name, number in self.contacts.items():
+                    index.setdefault(normalize_number(number), set()).add(name)
+                self._by_number = index
+            return self._by_number
+
+    def _append(self, lines):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _maybe_compact(self):
+        if self._journal_entries >= max(self.compact_threshold, len(self.contacts)):
+            self.compact()
+
+    def _record(self, entry):
+        line = json.dumps(entry) + "\n"
+        if self._batch_file is not None:
+            if not self._batch_entries:
+                self._batch_file.write(json.dumps({'op': 'begin'}) + "\n")
+            self._batch_file.write(line)  # Buffered by the file object, fsync'ed at commit
+            self._batch_entries += 1
+        else:
+            self._append([line])
+            self._journal_entries += 1
+            self._maybe_compact()
+
+    @contextmanager
+    def batch(self):
+        """Group changes into one atomic journal commit and one fsync"""
+        with self.lock:
+            if self._batch_file is not None:
+                yield self  # Nested batch joins the outer one
+                return
+            self._batch_file = open(self.journal_path, 'a', encoding='utf-8')
+            self._batch_entries = 0
+            try:
+                yield self
+            finally:
+                f, self._batch_file = self._batch_file, None
+                with f:
+                    if self._batch_entries:
+                        f.write(json.dumps({'op': 'commit'}) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                self._journal_entries += self._batch_entries
+                self._maybe_compact()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with self.lock:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.contacts, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            open(self.journal_path, 'w').close()
+            self._journal_entries = 0
+
+    def set(self, name, number):
+        with self.lock:
+            self._unindex(name)
+            self.contacts[name] = number
+            if self._by_number is not None:
+                self._by_number.setdefault(normalize_number(number), set()).add(name)
+            self._sorted_names = None
+            self._record({'op': 'set', 'name': name, 'number': number})
+
+    def delete(self, name):
+        with self.lock:
+            if name not in self.contacts:
+                return False
+            self._unindex(name)
+            del self.contacts[name]
+            self._sorted_names = None
+            self._record({'op': 'del', 'name': name})
+            return True
+
+    def _unindex(self, name):
+        old = self.contacts.get(name)
+        if old is None or self._by_number is None:
+            return
+        key = normalize_number(old)
+        names = self._by_number.get(key)
+        if names:
+            names.discard(name)
+            if not names:
+                del self._by_number[key]
+
+    def names_for_number(self, number):
+        """Reverse lookup: every contact name saved with this number"""
+        return sorted(self.by_number.get(normalize_number(number), ()))
+
+    def names_with_prefix(self, prefix, limit=10):
+        with self.lock:
+            if self._sorted_names is None:
+                self._sorted_names = sorted(self.contacts)
+            names = self._sorted_names
+        start = bisect.bisect_left(names, prefix)
+        matches = []
+        for name in names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+        return matches
+
+    def lookup(self, query):
+        """Resolve a lowercase name: exact, then unique prefix, then one close fuzzy match"""
+        if query in self.contacts:
+            return self.contacts[query]
+        prefixed = self.names_with_prefix(query, limit=2)
+        if len(prefixed) == 1:
+            return self.contacts[prefixed[0]]
+        if not prefixed and len(query) >= 3:
+            # Only same-initial names of similar length can clear the cutoff cheaply
+            candidates = [name for name in self.names_with_prefix(query[0], limit=len(self.contacts))
+                          if abs(len(name) - len(query)) <= 2]
+            close = difflib.get_close_matches(query, candidates, n=2, cutoff=0.85)
+            if len(close) == 1:
+                return self.contacts[close[0]]
+        return None
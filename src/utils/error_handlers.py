@@ -1,18 +1,16 @@
-import logging
-from config import settings
-import os
+from src.utils.log import get_logger
 
-# Ensure the logs directory exists
-os.makedirs(settings.PATHS['logs'], exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(settings.PATHS['logs'], 'whatsapp.log'),
-    level=logging.ERROR,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+class FatalError(RuntimeError):
+    """Unrecoverable failure (e.g. login); raised so the caller decides whether to exit"""
 
-def handle_error(message, fatal=False):
-    logging.error(message)
+
+def handle_error(message, fatal=False, **fields):
+    """Log ``message`` as a structured record, print it, and raise FatalError when ``fatal``.
+
+    Extra keyword arguments become fields of the JSON log record.
+    """
+    get_logger().error(message, extra={'fields': fields})
     print(f"⚠️ Error: {message}")
     if fatal:
-        exit(1)
+        raise FatalError(message)
@@ -4,6 +4,7 @@ import os
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from src.utils.phone import is_valid_number
 import os
 
 def get_media_path(file_path, direction='upload'):
@@ -18,5 +19,5 @@ def validate_file_path(file_path):
         raise IsADirectoryError(f"Expected file: {file_path}")
     return True
 def validate_phone_number(number: str) -> bool:
-    """Basic phone number validation"""
-    return number.startswith('+') and number[1:].isdigit()
+    """Phone number validation (see src.utils.phone)"""
+    return is_valid_number(number)
@@ -0,0 +1,141 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from config import settings
+
+logger = logging.getLogger('whatsapp')
+_context = contextvars.ContextVar('log_context', default={})
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, context fields and exc"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        entry.update(getattr(record, 'context', {}))
+        entry.update(getattr(record, 'fields', {}))
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            entry['exc'] = exc
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _ContextFilter(logging.Filter):
+    """Copies the caller's context fields onto the record before it crosses threads"""
+
+    def filter(self, record):
+        record.context = _context.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve the message and traceback now, keeping fields/context as attributes for JsonFormatter
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler():
+    path = settings.PATHS['log_file']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if settings.LOG_ROTATE_WHEN:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUPS, encoding='utf-8')
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUPS, encoding='utf-8')
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def setup_logging():
+    """Route the 'whatsapp' logger through a queue to a background file writer (idempotent).
+
+    Callers only enqueue records; the QueueListener thread formats them as
+    JSON lines and writes PATHS['log_file'], rotating by size
+    (LOG_MAX_BYTES) or by time (LOG_ROTATE_WHEN).
+    """
+    global _listener
+    if _listener is not None:
+        return logger
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        handler.addFilter(_ContextFilter())
+        logger.addHandler(handler)
+        logger.setLevel(settings.LOG_LEVEL)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(records, _file_handler(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        _install_debug_signal()
+    return logger
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # Drains what is still queued
+        _listener = None
+
+
+def _install_debug_signal():
+    """SIGUSR1 toggles DEBUG at runtime (POSIX, when set up from the main thread)"""
+    if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: toggle_debug())
+
+
+def get_logger():
+    return setup_logging()
+
+
+def set_level(level):
+    """Change the log level without a restart, e.g. set_level('DEBUG')"""
+    setup_logging()
+    logger.setLevel(level)
+    return logging.getLevelName(logger.level)
+
+
+def toggle_debug():
+    """Switch between DEBUG and LOG_LEVEL; returns the new level name"""
+    debug = logger.level != logging.DEBUG
+    return set_level(logging.DEBUG if debug else settings.LOG_LEVEL)
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (chat, operation, attempt, ...) to every record logged in this block"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def add_context(**fields):
+    """Add fields to the current context; they last until the enclosing log_context exits"""
+    _context.set({**_context.get(), **fields})
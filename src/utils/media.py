@@ -0,0 +1,211 @@
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.m4v', '.mkv', '.avi', '.webm'}
+USE_ORIGINAL = ''  # Cache entry meaning "compression did not help, upload the source file"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def format_rate(num_bytes, seconds):
+    """'3.2 MB at 1.4 MB/s' style summary"""
+    rate = num_bytes / seconds if seconds > 0 else 0.0
+    return f"{num_bytes / 1e6:.1f} MB at {rate / 1e6:.1f} MB/s"
+
+
+class MediaCache:
+    """Content-addressed file store: each key maps to one file in ``directory``.
+
+    Keys are sha256 digests (optionally with a variant suffix) or message
+    aliases, so the same content is written once however often it arrives.
+    The index is a small JSON file next to the files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except ValueError:
+                self.index = {}  # Files are still there, only dedup is lost
+
+    def get(self, key):
+        """Cached path for ``key``, USE_ORIGINAL, or None when unknown"""
+        with self.lock:
+            name = self.index.get(key)
+        if name is None:
+            return None
+        if name == USE_ORIGINAL:
+            return USE_ORIGINAL
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def link(self, key, name):
+        with self.lock:
+            self.index[key] = name
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(temp_path, self.index_path)
+
+    def adopt(self, key, temp_path, name):
+        """Move a finished file into the cache under ``key`` and return its path"""
+        os.makedirs(self.directory, exist_ok=True)
+        os.replace(temp_path, os.path.join(self.directory, name))
+        self.link(key, name)
+        return os.path.join(self.directory, name)
+
+    def put_bytes(self, data, name, alias=None):
+        """Store ``data`` unless identical content exists; returns (path, is_new)"""
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self.get(digest)
+        if existing:
+            if alias:
+                self.link(alias, os.path.basename(existing))
+            return existing, False
+        name = f"{digest[:12]}-{os.path.basename(name)}"
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = os.path.join(self.directory, f".{name}.part")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        path = self.adopt(digest, temp_path, name)
+        if alias:
+            self.link(alias, name)
+        return path, True
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_media_cache(directory):
+    """Process-wide MediaCache per directory, shared by pool workers so their index writes never race"""
+    directory = os.path.abspath(directory)
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = MediaCache(directory)
+        return _caches[directory]
+
+
+class MediaPipeline:
+    """Prepare uploads off-thread and store downloads without duplicates.
+
+    Images are downscaled to MEDIA_IMAGE_MAX_SIDE and re-encoded (needs
+    Pillow), and videos are re-encoded with ffmpeg when it is on PATH. Each
+    variant is cached by the source's content hash, so a file is processed
+    once however often it is sent. Anything that fails or comes out larger
+    is uploaded as is.
+    """
+
+    def __init__(self, workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or settings.MEDIA_WORKERS,
+                                           thread_name_prefix='media')
+        self.uploads = get_media_cache(settings.PATHS['media_cache'])
+        self.downloads = get_media_cache(settings.PATHS['media_download'])
+
+    def prepare(self, file_paths):
+        """Start preparing files in the background; pass the result to ready()"""
+        return [self.executor.submit(self._prepare_one, path) for path in file_paths]
+
+    def ready(self, futures):
+        """Wait for prepare() and return upload paths, identical files only once"""
+        seen = set()
+        paths = []
+        for future in futures:
+            digest, path = future.result()
+            if digest not in seen:
+                seen.add(digest)
+                paths.append(path)
+        return paths
+
+    def _prepare_one(self, path):
+        digest = file_sha256(path)
+        if not settings.MEDIA_COMPRESS:
+            return digest, path
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTENSIONS:
+            variant = f"{digest}-img{settings.MEDIA_IMAGE_MAX_SIDE}q{settings.MEDIA_JPEG_QUALITY}"
+            return digest, self._cached_variant(variant, path, self._compress_image)
+        if ext in VIDEO_EXTENSIONS and shutil.which('ffmpeg'):
+            variant = f"{digest}-vid{settings.MEDIA_VIDEO_CRF}"
+            return digest, self._cached_variant(variant, path, self._compress_video)
+        return digest, path
+
+    def _cached_variant(self, key, path, compress):
+        cached = self.uploads.get(key)
+        if cached is not None:
+            return cached or path
+        os.makedirs(self.uploads.directory, exist_ok=True)
+        temp_path = os.path.join(self.uploads.directory, f".{key}.part")
+        try:
+            ext = compress(path, temp_path)
+        except Exception:
+            ext = None  # Corrupt or unsupported input, upload it untouched
+        if ext is None or os.path.getsize(temp_path) >= os.path.getsize(path):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.uploads.link(key, USE_ORIGINAL)
+            return path
+        # Keep the original base name, WhatsApp shows it for documents
+        folder = key[:12] + key[64:]  # Short digest plus variant, e.g. 1bca8c31cd40-img1600q85
+        name = os.path.join(folder, os.path.splitext(os.path.basename(path))[0] + ext)
+        os.makedirs(os.path.join(self.uploads.directory, folder), exist_ok=True)
+        return self.uploads.adopt(key, temp_path, name)
+
+    def _compress_image(self, path, temp_path):
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        with Image.open(path) as image:
+            image.thumbnail((settings.MEDIA_IMAGE_MAX_SIDE, settings.MEDIA_IMAGE_MAX_SIDE))
+            if image.mode in ('RGBA', 'LA', 'P') and path.lower().endswith('.png'):
+                image.save(temp_path, 'PNG', optimize=True)  # Keep transparency
+                return '.png'
+            image.convert('RGB').save(temp_path, 'JPEG', quality=settings.MEDIA_JPEG_QUALITY, optimize=True)
+            return '.jpg'
+
+    def _compress_video(self, path, temp_path):
+        side = settings.MEDIA_VIDEO_MAX_SIDE
+        result = subprocess.run([
+            'ffmpeg', '-y', '-loglevel', 'error', '-i', path,
+            '-vf', f"scale='min({side},iw)':-2", '-c:v', 'libx264', '-preset', 'veryfast',
+            '-crf', str(settings.MEDIA_VIDEO_CRF), '-c:a', 'aac', '-movflags', '+faststart',
+            '-f', 'mp4', temp_path
+        ], capture_output=True)
+        return '.mp4' if result.returncode == 0 else None
+
+    def store_download(self, data, name, message_id=None):
+        """Save downloaded bytes unless identical content is already stored; returns (path, is_new)"""
+        return self.downloads.put_bytes(data, name, alias=f"id:{message_id}" if message_id else None)
+
+    def downloaded_ids(self):
+        with self.downloads.lock:
+            return [key[3:] for key in self.downloads.index if key.startswith('id:')]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def extension_for(mime):
+    return mimetypes.guess_extension((mime or '').split(';')[0].strip()) or '.bin'
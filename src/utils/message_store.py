@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    chat TEXT NOT NULL,
+    id TEXT NOT NULL,
+    seq REAL NOT NULL,
+    sender TEXT,
+    timestamp TEXT,
+    text TEXT,
+    incoming INTEGER,
+    stored_at REAL,
+    PRIMARY KEY (chat, id)
+);
+CREATE INDEX IF NOT EXISTS messages_chat_seq ON messages (chat, seq);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    chat TEXT PRIMARY KEY,
+    last_id TEXT NOT NULL,
+    updated_at REAL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, sender, chat UNINDEXED, content='messages', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text, sender, chat) VALUES (new.rowid, new.text, new.sender, new.chat);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, sender, chat)
+    VALUES ('delete', old.rowid, old.text, old.sender, old.chat);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, sender, chat)
+    VALUES ('delete', old.rowid, old.text, old.sender, old.chat);
+    INSERT INTO messages_fts (rowid, text, sender, chat) VALUES (new.rowid, new.text, new.sender, new.chat);
+END;
+"""
+
+UPSERT = """
+INSERT INTO messages (chat, id, seq, sender, timestamp, text, incoming, stored_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (chat, id) DO UPDATE SET
+    sender = excluded.sender, timestamp = excluded.timestamp,
+    text = excluded.text, incoming = excluded.incoming
+WHERE messages.text IS NOT excluded.text OR messages.sender IS NOT excluded.sender
+"""
+
+
+class MessageStore:
+    """Local SQLite (WAL) copy of chat history with a full-text index.
+
+    Messages are keyed by (chat, message id) and upserted on every sync;
+    ``seq`` keeps the on-screen order per chat. A per-chat cursor remembers
+    the newest synced message so repeat views only read newer rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False  # SQLite built without FTS5, search falls back to LIKE
+
+    def get_cursor(self, chat):
+        with self.lock:
+            row = self.conn.execute("SELECT last_id FROM sync_cursors WHERE chat = ?", (chat,)).fetchone()
+        return row['last_id'] if row else None
+
+    def upsert(self, chat, records, advance_cursor=True):
+        """Store records given in on-screen order; returns how many were new.
+
+        New records are slotted between the already stored records they
+        appear between on screen, so loading older history or filling a gap
+        keeps the chat in order.
+        """
+        if not records:
+            return 0
+        with self.lock, self.conn:
+            ids = [r['id'] for r in records]
+            known = {}
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                known.update((row['id'], row['seq']) for row in self.conn.execute(
+                    f"SELECT id, seq FROM messages WHERE chat = ? AND id IN ({','.join('?' * len(batch))})",
+                    [chat] + batch
+                ))
+            high = self.conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE chat = ?", (chat,)
+            ).fetchone()[0]
+
+            seqs = [known.get(record_id) for record_id in ids]
+            i = 0
+            while i < len(seqs):
+                if seqs[i] is not None:
+                    i += 1
+                    continue
+                run_end = i
+                while run_end < len(seqs) and seqs[run_end] is None:
+                    run_end += 1
+                if run_end == len(seqs):
+                    # Newest unknown rows go after everything stored
+                    for j in range(i, run_end):
+                        high += 1
+                        seqs[j] = high
+                else:
+                    upper = seqs[run_end]
+                    if i > 0:
+                        lower = seqs[i - 1]
+                    else:
+                        row = self.conn.execute(
+                            "SELECT MAX(seq) FROM messages WHERE chat = ? AND seq < ?", (chat, upper)
+                        ).fetchone()
+                        lower = row[0] if row[0] is not None else upper - (run_end - i) - 1
+                    step = (upper - lower) / (run_end - i + 1)
+                    for j in range(i, run_end):
+                        seqs[j] = lower + step * (j - i + 1)
+                i = run_end
+
+            now = time.time()
+            rows = [
+                (chat, record['id'], seq, record.get('sender'), record.get('timestamp'),
+                 record.get('text'), int(bool(record.get('incoming'))), now)
+                for record, seq in zip(records, seqs)
+            ]
+            self.conn.executemany(UPSERT, rows)
+            if advance_cursor:
+                self.conn.execute(
+                    "INSERT INTO sync_cursors (chat, last_id, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (chat) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at",
+                    (chat, records[-1]['id'], now)
+                )
+        return len(set(ids) - set(known))
+
+    def history(self, chat, limit=None):
+        """Return a chat's stored messages oldest first (the newest ``limit`` when given)"""
+        query = "SELECT * FROM messages WHERE chat = ? ORDER BY seq DESC"
+        params = [chat]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [self._record(row) for row in reversed(rows)]
+
+    def search(self, query, chat=None, limit=20):
+        """Full-text search over message text and sender, best matches first"""
+        terms = query.split()
+        if not terms:
+            return []
+        if self.has_fts:
+            match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+            sql = ("SELECT m.* FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+                   "WHERE messages_fts MATCH ?")
+            params = [match]
+            if chat:
+                sql += " AND m.chat = ?"
+                params.append(chat)
+            sql += " ORDER BY rank LIMIT ?"
+        else:
+            sql = "SELECT * FROM messages WHERE " + " AND ".join("text LIKE ?" for _ in terms)
+            params = [f"%{term}%" for term in terms]
+            if chat:
+                sql += " AND chat = ?"
+                params.append(chat)
+            sql += " ORDER BY stored_at DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._record(row) for row in rows]
+
+    def _record(self, row):
+        return {
+            'chat': row['chat'],
+            'id': row['id'],
+            'sender': row['sender'],
+            'timestamp': row['timestamp'],
+            'text': row['text'],
+            'incoming': bool(row['incoming'])
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
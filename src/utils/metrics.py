@@ -0,0 +1,281 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import settings
+from src.utils.log import get_logger, log_context
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """In-process counters and latency histograms, keyed by name and labels.
+
+    Updates take a single short lock and involve no I/O, so they are cheap
+    enough for every chromedriver command.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block into the ``<name>_seconds`` histogram and count it by outcome"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            yield
+            status = 'ok'
+        finally:
+            self.observe(name + '_seconds', time.perf_counter() - start, **labels)
+            self.inc(name + '_total', status=status, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """JSON-ready copy: counters, and per histogram count/sum/p50/p95/max bucket"""
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': round(h.sum, 6),
+                           'p50': _finite(h.quantile(0.5)), 'p95': _finite(h.quantile(0.95)),
+                           'buckets': list(h.counts)}
+                          for (name, labels), h in sorted(self.histograms.items())]
+        return {'started_at': self.started_at, 'uptime': time.time() - self.started_at,
+                'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                                  for k, v in pairs) + '}'
+
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = 'whatsapp_' + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{fmt_labels(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                metric = 'whatsapp_' + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), h.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_sum{fmt_labels(labels)} {h.sum}")
+                lines.append(f"{metric}_count{fmt_labels(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def timed(name):
+    """Decorator: time a call into ``<name>_seconds``; a False/None result counts as 'failed'.
+
+    Records logged during the call carry ``operation=name``, and a DEBUG
+    record with the duration and status is logged when it returns.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 'error'
+            with log_context(operation=name):
+                try:
+                    result = fn(*args, **kwargs)
+                    status = 'failed' if result is False or result is None else 'ok'
+                    return result
+                finally:
+                    elapsed = time.perf_counter() - start
+                    metrics.observe(name + '_seconds', elapsed)
+                    metrics.inc(name + '_total', status=status)
+                    logger = get_logger()
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"{name} {status}", extra={'fields': {'duration': round(elapsed, 4),
+                                                                          'status': status}})
+        return wrapper
+    return decorator
+
+
+class TimedLock:
+    """threading.Lock that records how long callers wait to acquire it"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired or blocking:
+            metrics.observe('lock_wait_seconds', time.perf_counter() - start, lock=self.name)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def instrument_driver(driver):
+    """Count and time every chromedriver round trip made through ``driver``"""
+    executor = driver.command_executor
+    execute = executor.execute
+
+    def counted_execute(command, params):
+        with metrics.timer('webdriver_command', command=command):
+            return execute(command, params)
+
+    executor.execute = counted_execute
+    return driver
+
+
+_exporters_started = False
+
+
+def start_exporters():
+    """Start the Prometheus endpoint and/or periodic JSON dump enabled in settings (once per process)"""
+    global _exporters_started
+    if _exporters_started:
+        return
+    _exporters_started = True
+
+    if settings.METRICS_PORT:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot()).encode('utf-8'), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', settings.METRICS_PORT), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[✓] Metrics on http://127.0.0.1:{settings.METRICS_PORT}/metrics")
+
+    if settings.METRICS_DUMP_INTERVAL:
+        def dump_forever():
+            while True:
+                time.sleep(settings.METRICS_DUMP_INTERVAL)
+                dump_json()
+        threading.Thread(target=dump_forever, daemon=True).start()
+
+
+def dump_json(path=None):
+    path = path or settings.PATHS['metrics']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics.snapshot(), f)
+    os.replace(temp_path, path)
+
+
+def format_summary(snapshot):
+    """Human-readable table for the ``stats`` command"""
+    lines = [f"Uptime: {snapshot['uptime']:.0f}s"]
+    histograms = snapshot['histograms']
+    if histograms:
+        lines.append(f"  {'timer':<40} {'count':>7} {'mean':>9} {'p50':>8} {'p95':>8} {'total':>9}")
+        for h in histograms:
+            label = h['name'] + ''.join(f" {k}={v}" for k, v in sorted(h['labels'].items()))
+            mean = h['sum'] / h['count'] if h['count'] else 0
+            lines.append(f"  {label:<40} {h['count']:>7} {mean * 1000:>7.1f}ms "
+                         f"{'≤' + _fmt_bound(h['p50']):>8} {'≤' + _fmt_bound(h['p95']):>8} {h['sum']:>8.2f}s")
+    scheduler = snapshot.get('scheduler')
+    if scheduler:
+        queued = ', '.join(f"{priority} {count}" for priority, count in scheduler['queued'].items())
+        lines.append(f"  scheduler: {scheduler['rate_per_sec']}/s, {scheduler['in_flight']} in flight, "
+                     f"queued {queued}, {scheduler['deferred']} deferred")
+    failures = [c for c in snapshot['counters'] if c['labels'].get('status') not in (None, 'ok') and c['value']]
+    for c in failures:
+        lines.append(f"  {c['name']} {c['labels']['status']}: {c['value']}")
+    return '\n'.join(lines)
+
+
+def _finite(seconds):
+    return None if seconds == float('inf') else seconds  # JSON has no Infinity
+
+
+def _fmt_bound(seconds):
+    if seconds is None:
+        return '60s+'
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:g}s"
@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+
+from selenium.common.exceptions import WebDriverException
+
+from config import settings
+from src.utils.metrics import metrics
+from src.utils.page_scripts import SWITCH_CHAT_JS
+from src.utils.selectors import selectors
+
+CHAT_TITLE_JS = """
+const node = document.querySelector('#main header span[title]');
+return node ? node.getAttribute('title') : null;
+"""
+
+
+class ChatNavigator:
+    """Switches chats inside the running WhatsApp Web app.
+
+    Opening ``/send?phone=`` reloads the whole app. Once a chat has been
+    loaded that way, its header title is remembered in an LRU of
+    NAV_LRU_SIZE chats. Going back to it later clicks its row in the chat
+    list, or searches for it first, which leaves the page in place. The
+    switch only counts once the conversation's jid matches the phone, and
+    chats whose title another remembered chat shares are never switched
+    in-app. switch() returns None whenever that is not possible, and the
+    caller then falls back to the URL.
+    """
+
+    def __init__(self, driver, size=None):
+        self.driver = driver
+        self.size = size or settings.NAV_LRU_SIZE
+        self.chats = OrderedDict()  # phone digits -> chat header title
+        self.current = None
+
+    def switch(self, phone, ready):
+        """Open a known chat in-app and return the ``ready`` element, or None"""
+        if not settings.NAV_IN_APP:
+            return None
+        title = self.chats.get(phone)
+        if title is None:
+            return None
+        if any(other != phone and known == title for other, known in self.chats.items()):
+            metrics.inc('chat_switch_total', method='fallback')
+            return None  # The row to click is ambiguous; the URL names the chat by number
+        self.chats.move_to_end(phone)
+        method = 'current' if self.current == phone else 'in_app'
+        start = time.perf_counter()
+        try:
+            timeout = settings.TIMEOUTS['chat_switch']
+            self.driver.set_script_timeout(timeout + 5)
+            element = self.driver.execute_async_script(
+                SWITCH_CHAT_JS, title, f"{phone}@c.us", phone, selectors.candidates('chat_search'),
+                selectors.candidates(ready), int(timeout * 1000)
+            )
+        except WebDriverException:
+            element = None
+        if element is None:
+            # Archived, renamed, scrolled away or unconfirmed; reload it and learn the title again
+            self.forget(phone)
+            metrics.inc('chat_switch_total', method='fallback')
+            return None
+        self.current = phone
+        metrics.observe('chat_switch_seconds', time.perf_counter() - start, method=method)
+        metrics.inc('chat_switch_total', method=method)
+        return element
+
+    def loaded(self, phone, elapsed=None):
+        """Remember a chat just opened through the URL"""
+        self.current = phone
+        if elapsed is not None:
+            metrics.observe('chat_switch_seconds', elapsed, method='reload')
+        metrics.inc('chat_switch_total', method='reload')
+        try:
+            title = self.driver.execute_script(CHAT_TITLE_JS)
+        except WebDriverException:
+            title = None
+        if not title:
+            return
+        self.chats[phone] = title
+        self.chats.move_to_end(phone)
+        while len(self.chats) > self.size:
+            self.chats.popitem(last=False)
+
+    def forget(self, phone=None):
+        """Drop one chat, or every chat (e.g. after the page was replaced)"""
+        if phone is None:
+            self.chats.clear()
+        else:
+            self.chats.pop(phone, None)
+        self.current = None
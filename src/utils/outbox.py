@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import uuid
+
+
+class Outbox:
+    """Persistent outbound queue backed by an append-only JSON lines journal.
+
+    Every enqueued item is written as a ``put`` record and every sent item
+    as a ``done`` record, so a crash mid-flush only replays the items that
+    were never confirmed. A failed try is journaled as ``fail``: the item
+    stays queued for the next flush and its ``attempts`` count goes up,
+    until the dispatcher gives up on it with a ``done`` record of status
+    ``failed``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.items = {}  # id -> item, insertion ordered
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._replay()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash, ignore the tail
+                if record.get('op') == 'put':
+                    self.items[record['item']['id']] = record['item']
+                elif record.get('op') == 'done':
+                    self.items.pop(record['id'], None)
+                elif record.get('op') == 'fail' and record['id'] in self.items:
+                    item = self.items[record['id']]
+                    item['attempts'] = item.get('attempts', 0) + 1
+
+    def _append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def put(self, number, kind, text="", file_path=None, caption=""):
+        """Queue a text or file item and return its id."""
+        item = {
+            'id': uuid.uuid4().hex,
+            'number': number,
+            'kind': kind,
+            'text': text,
+            'file_path': file_path,
+            'caption': caption,
+            'attempts': 0
+        }
+        with self.lock:
+            self._append({'op': 'put', 'item': item})
+            self.items[item['id']] = item
+        return item['id']
+
+    def pending(self):
+        """Return the queued items in enqueue order."""
+        with self.lock:
+            return list(self.items.values())
+
+    def mark_failed(self, item_id, error):
+        """Record a failed try; the item stays pending. Returns its attempt count."""
+        with self.lock:
+            item = self.items.get(item_id)
+            if item is None:
+                return 0
+            self._append({'op': 'fail', 'id': item_id, 'error': error})
+            item['attempts'] = item.get('attempts', 0) + 1
+            return item['attempts']
+
+    def mark_done(self, item_id, status='sent'):
+        """Remove an item from the queue for good: sent, or failed beyond retrying."""
+        with self.lock:
+            self._append({'op': 'done', 'id': item_id, 'status': status})
+            self.items.pop(item_id, None)
+            if not self.items:
+                # Nothing left to replay, start a fresh journal
+                open(self.path, 'w').close()
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,505 @@
+"""JavaScript snippets executed inside the WhatsApp Web page."""
+from config import settings
+
+# Selector candidates arrive as [kind, expr] pairs from src.utils.selectors,
+# kind being 'css' or 'xpath'. findFirst() returns [element, candidateIndex]
+# for the first candidate that matches, or [null, -1].
+FIND_JS = """
+function findOne(kind, expr) {
+    if (kind === 'xpath') {
+        return document.evaluate(expr, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    return document.querySelector(expr);
+}
+function findFirst(candidates) {
+    for (let i = 0; i < candidates.length; i++) {
+        const el = findOne(candidates[i][0], candidates[i][1]);
+        if (el) return [el, i];
+    }
+    return [null, -1];
+}
+"""
+
+# Startup self-check: evaluates every candidate of every registered element
+# in one call. Returns {name: {match, invalid}}, where match is the index
+# of the first candidate found on the current screen (-1 for none) and
+# invalid lists the candidates the browser rejected as malformed.
+SELECTOR_CHECK_JS = FIND_JS + """
+const [registry] = arguments;
+const report = {};
+for (const [name, candidates] of Object.entries(registry)) {
+    const entry = {match: -1, invalid: []};
+    candidates.forEach(([kind, expr], i) => {
+        try {
+            if (findOne(kind, expr) && entry.match < 0) entry.match = i;
+        } catch (e) {
+            entry.invalid.push(i);
+        }
+    });
+    report[name] = entry;
+}
+return report;
+"""
+
+# Message row selector and the record shape shared by the monitor and the
+# bulk extractor: {kind, id, chat, jid, timestamp, sender, text, incoming}.
+# jid is the conversation the row belongs to, taken from its data-id
+# ("false_15551234567@c.us_3EB0..."), or null when the row carries none.
+MESSAGE_RECORD_JS = """
+const ROW = 'div.copyable-text[data-pre-plain-text]';
+function chatTitle() {
+    const header = document.querySelector('#main header span[title]');
+    return header ? header.getAttribute('title') : null;
+}
+function messageRecord(node, chat) {
+    const meta = node.getAttribute('data-pre-plain-text') || '';
+    const match = meta.match(/^\\[([^\\]]*)\\]\\s*(.*?):\\s*$/);
+    const holder = node.closest('[data-id]');
+    const textNode = node.querySelector('span.selectable-text');
+    const text = textNode ? textNode.innerText : node.innerText;
+    const id = holder ? holder.getAttribute('data-id') : [chat, meta, text].join('|');
+    const jid = holder ? id.match(/^(?:true|false)_([^_]+@[^_]+)_/) : null;
+    return {
+        kind: 'message', id: id, chat: chat, jid: jid ? jid[1] : null,
+        timestamp: match ? match[1] : '', sender: match ? match[2] : '', text: text,
+        incoming: holder ? !id.startsWith('true_') : !node.closest('.message-out')
+    };
+}
+"""
+
+# Installs a single document-wide MutationObserver that pushes newly
+# appended message nodes of the open chat, and chat-list rows that gain an
+# unread badge, into window.__waMonitor.buffer. Rows already rendered when a
+# chat opens (history) are taken as the high-water mark and never pushed.
+MONITOR_INSTALL_JS = """
+(function () {
+    if (window.__waMonitor) return;
+    const LIMIT = __BUFFER_LIMIT__;
+    __MESSAGE_RECORD__
+    const state = window.__waMonitor = {buffer: [], waiter: null};
+    let lastRow = null;
+    let scheduled = false;
+    const dirtyRows = new Set();
+
+    function push(item) {
+        state.buffer.push(item);
+        if (state.buffer.length > LIMIT) state.buffer.shift();
+        if (state.waiter) { const wake = state.waiter; state.waiter = null; wake(); }
+    }
+    function scanMessages() {
+        const rows = document.querySelectorAll(ROW);
+        if (!rows.length) { lastRow = null; return; }
+        if (!lastRow || !lastRow.isConnected) {
+            // A chat was (re)opened: everything rendered now is history
+            lastRow = rows[rows.length - 1];
+            return;
+        }
+        const fresh = [];
+        for (let i = rows.length - 1; i >= 0 && rows[i] !== lastRow; i--) {
+            // Walk back from the bottom only until the previous high-water mark
+            if (lastRow.compareDocumentPosition(rows[i]) & Node.DOCUMENT_POSITION_FOLLOWING) fresh.push(rows[i]);
+        }
+        lastRow = rows[rows.length - 1];
+        const chat = chatTitle();
+        for (let i = fresh.length - 1; i >= 0; i--) push(messageRecord(fresh[i], chat));
+    }
+    function scanUnread() {
+        dirtyRows.forEach((row) => {
+            if (!row.isConnected || !row.querySelector('span[aria-label*="unread"]')) return;
+            const titles = row.querySelectorAll('span[title]');
+            if (!titles.length) return;
+            const chat = titles[0].getAttribute('title');
+            const preview = titles[titles.length - 1].getAttribute('title');
+            push({kind: 'unread', id: 'unread|' + chat + '|' + preview, chat: chat,
+                  timestamp: '', sender: chat, text: preview, incoming: true});
+        });
+        dirtyRows.clear();
+    }
+    function scan() {
+        scheduled = false;
+        scanMessages();
+        scanUnread();
+    }
+    new MutationObserver((mutations) => {
+        for (const m of mutations) {
+            const target = m.target.nodeType === 1 ? m.target : m.target.parentElement;
+            const row = target && target.closest('#pane-side [role="listitem"], #pane-side [role="row"]');
+            if (row) dirtyRows.add(row);
+        }
+        if (!scheduled) { scheduled = true; setTimeout(scan, 0); }
+    }).observe(document, {childList: true, subtree: true, characterData: true});
+    if (document.readyState !== 'loading') scanMessages();
+})();
+""".replace('__BUFFER_LIMIT__', str(settings.MONITOR_BUFFER_LIMIT)).replace('__MESSAGE_RECORD__', MESSAGE_RECORD_JS)
+
+# Long-polls the monitor buffer: resolves immediately when items are
+# waiting, otherwise as soon as the observer pushes one or after waitMs.
+MONITOR_DRAIN_JS = MONITOR_INSTALL_JS + """
+const [waitMs, done] = arguments;
+const monitor = window.__waMonitor;
+function drain() { const items = monitor.buffer; monitor.buffer = []; done(items); }
+if (monitor.buffer.length) {
+    drain();
+} else {
+    const timer = setTimeout(() => { monitor.waiter = null; drain(); }, waitMs);
+    monitor.waiter = () => { clearTimeout(timer); drain(); };
+}
+"""
+
+# Returns {total, start, messages} for rows[start:start + count] of the open
+# chat in a single round trip (count 0 means "to the end"). With afterId the
+# range begins right after that message when it is still rendered.
+EXTRACT_MESSAGES_JS = MESSAGE_RECORD_JS + """
+let [start, count, afterId] = arguments;
+const rows = document.querySelectorAll(ROW);
+if (afterId) {
+    for (let i = rows.length - 1; i >= 0; i--) {
+        const holder = rows[i].closest('[data-id]');
+        if (holder && holder.getAttribute('data-id') === afterId) { start = Math.max(start, i + 1); break; }
+    }
+}
+const end = count ? Math.min(rows.length, start + count) : rows.length;
+const chat = chatTitle();
+const messages = [];
+for (let i = start; i < end; i++) messages.push(messageRecord(rows[i], chat));
+return {total: rows.length, start: start, messages: messages};
+"""
+
+# Scrolls the message pane to the top and resolves with the number of older
+# rows WhatsApp rendered in response (0 when the history start is reached
+# or nothing arrived before timeoutMs).
+LOAD_OLDER_MESSAGES_JS = MESSAGE_RECORD_JS + """
+const [timeoutMs, done] = arguments;
+const rows = document.querySelectorAll(ROW);
+let scroller = rows.length ? rows[0].parentElement : null;
+while (scroller && scroller !== document.body &&
+       !(scroller.scrollHeight > scroller.clientHeight && getComputedStyle(scroller).overflowY !== 'visible')) {
+    scroller = scroller.parentElement;
+}
+if (!scroller || scroller === document.body) {
+    done(0);
+} else {
+    const before = rows.length;
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        const added = document.querySelectorAll(ROW).length - before;
+        if (added > 0) { observer.disconnect(); clearTimeout(timer); done(added); }
+    });
+    observer.observe(scroller, {childList: true, subtree: true});
+    timer = setTimeout(() => { observer.disconnect(); done(0); }, timeoutMs);
+    scroller.scrollTop = 0;
+}
+"""
+
+# Collects media rendered in the open chat (blob: images and videos) and
+# resolves with [{id, mime, data}] where data is base64, newest first. Rows
+# whose data-id is in skipIds are ignored, and collection stops after
+# limit items or maxBytes in total.
+COLLECT_MEDIA_JS = """
+const [skipIds, limit, maxBytes, done] = arguments;
+const skip = new Set(skipIds);
+const nodes = Array.from(document.querySelectorAll('#main img[src^="blob:"], #main video[src^="blob:"]')).reverse();
+const seen = new Set();
+const found = [];
+for (const node of nodes) {
+    const holder = node.closest('[data-id]');
+    const id = holder ? holder.getAttribute('data-id') : null;
+    if (!id || skip.has(id) || seen.has(id)) continue;
+    seen.add(id);
+    found.push({id: id, src: node.src});
+    if (found.length >= limit) break;
+}
+(async () => {
+    const items = [];
+    let total = 0;
+    for (const item of found) {
+        try {
+            const blob = await (await fetch(item.src)).blob();
+            if (total + blob.size > maxBytes) break;
+            total += blob.size;
+            const dataUrl = await new Promise((resolve, reject) => {
+                const reader = new FileReader();
+                reader.onload = () => resolve(reader.result);
+                reader.onerror = reject;
+                reader.readAsDataURL(blob);
+            });
+            items.push({id: item.id, mime: blob.type, data: dataUrl.slice(dataUrl.indexOf(',') + 1)});
+        } catch (e) {
+            // Revoked blob URL (scrolled out of view); skip it
+        }
+    }
+    done(items);
+})();
+"""
+
+# Switches to a chat inside the running app instead of reloading it. The
+# chat-list row titled ``title`` is clicked, first typing ``query`` into the
+# search box when the row is not rendered. Resolves with the readyTarget
+# element once the header shows ``title`` and the conversation's message
+# rows carry ``jid`` in their data-id, so two contacts with the same name
+# cannot be mixed up. Resolves null on timeout, or when the chat has no
+# rows to confirm it by, so the caller can fall back to the /send URL.
+SWITCH_CHAT_JS = FIND_JS + """
+const [title, jid, query, searchBox, readyTarget, timeoutMs, done] = arguments;
+const UNCONFIRMED_GRACE_MS = 1000;  // Rows render just after the header; none by then means an empty chat
+let graceTimer = null;
+function header() {
+    const node = document.querySelector('#main header span[title]');
+    return node ? node.getAttribute('title') : null;
+}
+function conversationJid() {
+    const node = document.querySelector('#main [data-id]');
+    const match = node ? node.getAttribute('data-id').match(/^(?:true|false)_([^_]+@[^_]+)_/) : null;
+    return match ? match[1] : null;
+}
+function row() {
+    for (const node of document.querySelectorAll('#pane-side span[title]')) {
+        if (node.getAttribute('title') === title) return node.closest('[role=listitem], [role=row]') || node;
+    }
+    return null;
+}
+function ready() {
+    const el = header() === title ? findFirst(readyTarget)[0] : null;
+    if (!el || !(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) return null;
+    const current = conversationJid();
+    if (current === jid) return el;
+    if (current === null && !graceTimer) {
+        graceTimer = setTimeout(() => { if (conversationJid() !== jid) finish(null); }, UNCONFIRMED_GRACE_MS);
+    }
+    return null;  // Rows of the previous chat still showing, or not rendered yet
+}
+function setSearch(text) {
+    const box = findFirst(searchBox)[0];
+    if (!box) return false;
+    box.focus();
+    document.execCommand('selectAll', false, null);
+    if (text) document.execCommand('insertText', false, text);
+    else document.execCommand('delete', false, null);
+    return true;
+}
+let finished = false;
+let clicked = false;
+let searched = false;
+let timer = null;
+const observer = new MutationObserver(step);
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    clearTimeout(graceTimer);
+    if (searched) setSearch('');
+    done(result);
+}
+function step() {
+    if (finished) return;
+    const el = ready();
+    if (el) { finish(el); return; }
+    if (clicked) return;
+    const target = row();
+    if (target) {
+        clicked = true;
+        for (const type of ['mousedown', 'mouseup', 'click']) {
+            target.dispatchEvent(new MouseEvent(type, {bubbles: true, cancelable: true, view: window}));
+        }
+    } else if (!searched) {
+        searched = true;
+        if (!setSearch(query)) finish(null);
+    }
+}
+observer.observe(document, {childList: true, subtree: true, attributes: true, attributeFilter: ['title', 'style']});
+timer = setTimeout(() => finish(null), timeoutMs);
+step();
+"""
+
+# Reads the login QR canvas once per rotation. Pixels are sampled into a
+# module grid (rows of '1' dark / '0' light), with the module size taken from
+# the top-left finder pattern, which is 7 modules wide. Resolves as soon as
+# the grid differs from previousKey with {key, rows, png} (png: toDataURL
+# base64), with {gone: true} once the canvas is removed (scanned), or null
+# when nothing changed within timeoutMs.
+QR_READ_JS = FIND_JS + """
+const [qrCanvas, previousKey, timeoutMs, done] = arguments;
+function canvasNode() {
+    return findFirst(qrCanvas)[0];
+}
+function readGrid(canvas) {
+    const w = canvas.width, h = canvas.height;
+    if (!w || !h) return null;
+    const copy = document.createElement('canvas');
+    copy.width = w;
+    copy.height = h;
+    const ctx = copy.getContext('2d');
+    ctx.drawImage(canvas, 0, 0);  // Works whatever context the page drew with
+    const px = ctx.getImageData(0, 0, w, h).data;
+    const dark = (x, y) => {
+        const i = (Math.floor(y) * w + Math.floor(x)) * 4;
+        return px[i + 3] > 127 && (px[i] * 299 + px[i + 1] * 587 + px[i + 2] * 114) / 1000 < 128;
+    };
+    let minX = w, minY = h, maxX = -1, maxY = -1;
+    for (let y = 0; y < h; y++) {
+        for (let x = 0; x < w; x++) {
+            if (dark(x, y)) {
+                if (x < minX) minX = x;
+                if (x > maxX) maxX = x;
+                if (y < minY) minY = y;
+                if (y > maxY) maxY = y;
+            }
+        }
+    }
+    if (maxX < 0) return null;  // Not drawn yet
+    let run = 0;
+    while (minX + run <= maxX && dark(minX + run, minY)) run++;
+    const module = run / 7;
+    const count = Math.round((maxX - minX + 1) / module);
+    if (count < 21) return null;  // Smaller than a version 1 code: still rendering
+    const rows = [];
+    for (let r = 0; r < count; r++) {
+        let row = '';
+        for (let c = 0; c < count; c++) {
+            row += dark(minX + (c + 0.5) * module, minY + (r + 0.5) * module) ? '1' : '0';
+        }
+        rows.push(row);
+    }
+    return rows;
+}
+let finished = false;
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    clearInterval(poll);
+    clearTimeout(timer);
+    done(result);
+}
+function check() {
+    const canvas = canvasNode();
+    if (!canvas) { finish({gone: true}); return; }
+    const rows = readGrid(canvas);
+    if (!rows) return;
+    const key = rows.join('');
+    if (key !== previousKey) {
+        const png = canvas.toDataURL('image/png');
+        finish({key: key, rows: rows, png: png.slice(png.indexOf(',') + 1)});
+    }
+}
+const poll = setInterval(check, 250);
+const timer = setTimeout(() => finish(null), timeoutMs);
+check();
+"""
+
+# Structured-clone values are tagged so binary data survives JSON:
+# ArrayBuffers and typed arrays become {__wa_bytes: base64, type: name}.
+STORAGE_CODEC_JS = """
+function encodeValue(v) {
+    if (v instanceof ArrayBuffer) return {__wa_bytes: toBase64(new Uint8Array(v)), type: 'ArrayBuffer'};
+    if (ArrayBuffer.isView(v)) {
+        return {__wa_bytes: toBase64(new Uint8Array(v.buffer, v.byteOffset, v.byteLength)), type: v.constructor.name};
+    }
+    if (typeof CryptoKey !== 'undefined' && v instanceof CryptoKey) throw new Error('non-serializable');
+    if (Array.isArray(v)) return v.map(encodeValue);
+    if (v && typeof v === 'object') {
+        const out = {};
+        for (const k of Object.keys(v)) out[k] = encodeValue(v[k]);
+        return out;
+    }
+    return v;
+}
+function decodeValue(v) {
+    if (Array.isArray(v)) return v.map(decodeValue);
+    if (v && typeof v === 'object') {
+        if ('__wa_bytes' in v) {
+            const bytes = Uint8Array.from(atob(v.__wa_bytes), (c) => c.charCodeAt(0));
+            return v.type === 'ArrayBuffer' ? bytes.buffer : new self[v.type](bytes.buffer);
+        }
+        const out = {};
+        for (const k of Object.keys(v)) out[k] = decodeValue(v[k]);
+        return out;
+    }
+    return v;
+}
+function toBase64(bytes) {
+    let s = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) s += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    return btoa(s);
+}
+function request(req) {
+    return new Promise((resolve, reject) => { req.onsuccess = () => resolve(req.result); req.onerror = () => reject(req.error); });
+}
+"""
+
+# Resolves with {localStorage, indexedDB: [...], skipped} for the current
+# origin, limited to the IndexedDB databases named in ``databases`` (the
+# auth/key ones; message and chat caches can be hundreds of MB). Records
+# holding non-extractable values (CryptoKey) are skipped; those only
+# survive through the persistent Chrome profile directory.
+STORAGE_SNAPSHOT_JS = STORAGE_CODEC_JS + """
+const [wanted, done] = arguments;
+(async () => {
+    const snapshot = {localStorage: {}, indexedDB: [], skipped: 0};
+    for (let i = 0; i < localStorage.length; i++) {
+        const key = localStorage.key(i);
+        snapshot.localStorage[key] = localStorage.getItem(key);
+    }
+    const databases = indexedDB.databases ? await indexedDB.databases() : [];
+    for (const info of databases.filter((db) => wanted.includes(db.name))) {
+        const db = await request(indexedDB.open(info.name));
+        const dump = {name: db.name, version: db.version, stores: []};
+        for (const storeName of Array.from(db.objectStoreNames)) {
+            const store = db.transaction(storeName, 'readonly').objectStore(storeName);
+            const [keys, values] = await Promise.all([request(store.getAllKeys()), request(store.getAll())]);
+            const indexes = Array.from(store.indexNames).map((n) => {
+                const index = store.index(n);
+                return {name: n, keyPath: index.keyPath, unique: index.unique, multiEntry: index.multiEntry};
+            });
+            const records = [];
+            for (let i = 0; i < keys.length; i++) {
+                try {
+                    records.push([encodeValue(keys[i]), encodeValue(values[i])]);
+                } catch (e) {
+                    snapshot.skipped++;
+                }
+            }
+            dump.stores.push({name: storeName, keyPath: store.keyPath, autoIncrement: store.autoIncrement,
+                              indexes: indexes, records: records});
+        }
+        db.close();
+        snapshot.indexedDB.push(dump);
+    }
+    return snapshot;
+})().then(done, (e) => done({error: String(e)}));
+"""
+
+# Writes a STORAGE_SNAPSHOT_JS snapshot back into the current origin.
+# Must run before the WhatsApp app boots on that origin.
+STORAGE_RESTORE_JS = STORAGE_CODEC_JS + """
+const [snapshot, done] = arguments;
+(async () => {
+    for (const [key, value] of Object.entries(snapshot.localStorage || {})) localStorage.setItem(key, value);
+    for (const dump of snapshot.indexedDB || []) {
+        const open = indexedDB.open(dump.name, dump.version);
+        open.onupgradeneeded = () => {
+            const db = open.result;
+            for (const spec of dump.stores) {
+                if (db.objectStoreNames.contains(spec.name)) continue;
+                const store = db.createObjectStore(spec.name, {keyPath: spec.keyPath, autoIncrement: spec.autoIncrement});
+                for (const index of spec.indexes) {
+                    store.createIndex(index.name, index.keyPath, {unique: index.unique, multiEntry: index.multiEntry});
+                }
+            }
+        };
+        const db = await request(open);
+        for (const spec of dump.stores) {
+            if (!db.objectStoreNames.contains(spec.name)) continue;
+            const tx = db.transaction(spec.name, 'readwrite');
+            const store = tx.objectStore(spec.name);
+            for (const [key, value] of spec.records) {
+                if (spec.keyPath === null) store.put(decodeValue(value), decodeValue(key));
+                else store.put(decodeValue(value));
+            }
+            await new Promise((resolve, reject) => { tx.oncomplete = resolve; tx.onerror = () => reject(tx.error); });
+        }
+        db.close();
+    }
+    return true;
+})().then(done, (e) => done({error: String(e)}));
+"""
@@ -0,0 +1,147 @@
+import json
+import os
+import re
+import threading
+import time
+
+from config import settings
+
+NUMBER_JUNK = re.compile(r"[\s\-().\/]")
+E164 = re.compile(r"\+[1-9]\d{6,14}")
+
+
+class InvalidNumberError(ValueError):
+    """The number cannot be dialled: malformed or known not to be on WhatsApp"""
+
+
+def to_e164(number, country_code=None):
+    """Canonicalize a phone number to E.164 (+<country><subscriber>).
+
+    Spaces, dashes, dots and brackets are dropped and a leading 00 is read as
+    +. A number with a single leading 0 is national and gets
+    ``country_code`` (default settings.DEFAULT_COUNTRY_CODE), as does one of
+    at most NATIONAL_NUMBER_MAX_DIGITS bare digits, e.g. "(555) 987-6543".
+    Longer bare digits are taken to already include the country code, as
+    in wa.me links. Raises InvalidNumberError when the number is national
+    and no country code is known, or the result is not valid E.164.
+    """
+    raw = str(number).strip()
+    if raw[:4].lower() == 'tel:':
+        raw = raw[4:]
+    digits = NUMBER_JUNK.sub('', raw)
+    if digits.startswith('00'):
+        digits = '+' + digits[2:]
+    elif digits.startswith('0') or (digits.isdigit() and len(digits) <= settings.NATIONAL_NUMBER_MAX_DIGITS):
+        country_code = (country_code if country_code is not None else settings.DEFAULT_COUNTRY_CODE).lstrip('+')
+        if not country_code:
+            raise InvalidNumberError(f"National number without a country code (add +<country> "
+                                     f"or set DEFAULT_COUNTRY_CODE): {number}")
+        digits = '+' + country_code + (digits[1:] if digits.startswith('0') else digits)
+    elif not digits.startswith('+'):
+        digits = '+' + digits
+    if not E164.fullmatch(digits):
+        raise InvalidNumberError(f"Invalid phone number: {number}")
+    return digits
+
+
+def normalize_number(number):
+    """Lenient canonical key: E.164 when possible, else the number stripped of punctuation"""
+    try:
+        return to_e164(number)
+    except InvalidNumberError:
+        return NUMBER_JUNK.sub('', str(number))
+
+
+def is_valid_number(number):
+    try:
+        to_e164(number)
+        return True
+    except InvalidNumberError:
+        return False
+
+
+class NumberCache:
+    """Remembered WhatsApp registration status per E.164 number, with a TTL.
+
+    Results are kept in a small JSON file so a number that was found not to
+    be on WhatsApp is rejected before any browser work, even after a restart.
+    New results are appended to ``<path>.journal``, which is folded into
+    the JSON file once it holds as many lines as the cache has numbers, so
+    a broadcast to n new numbers costs O(n) writes, not n full rewrites.
+    """
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or settings.PATHS['number_cache']
+        self.journal_path = self.path + '.journal'
+        self.ttl = settings.NUMBER_CACHE_TTL if ttl is None else ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.journal_entries = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}  # Corrupt cache only costs re-checks
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash, ignore it
+                    self.entries[entry['number']] = {'registered': entry['registered'],
+                                                     'checked_at': entry['checked_at']}
+                    self.journal_entries += 1
+
+    def status(self, number):
+        """True/False for a fresh cached result, None when unknown or expired"""
+        with self.lock:
+            entry = self.entries.get(number)
+        if entry is None or time.time() - entry['checked_at'] > self.ttl:
+            return None
+        return entry['registered']
+
+    def record(self, number, registered):
+        with self.lock:
+            previous = self.entries.get(number)
+            entry = self.entries[number] = {'registered': bool(registered), 'checked_at': time.time()}
+            if previous and previous['registered'] == bool(registered) \
+                    and time.time() - previous['checked_at'] < self.ttl / 2:
+                return  # Still fresh on disk, skip the write
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'number': number, **entry}) + "\n")
+            self.journal_entries += 1
+            if self.journal_entries >= max(100, len(self.entries)):
+                self._compact()
+
+    def _compact(self):
+        """Fold the journal into the JSON file; the caller holds the lock"""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.path)
+        open(self.journal_path, 'w').close()
+        self.journal_entries = 0
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_number_cache(path=None):
+    """Process-wide NumberCache per file, shared by pool workers"""
+    path = path or settings.PATHS['number_cache']
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = NumberCache(path)
+        return _caches[path]
+
+
+def check_number(number, cache=None):
+    """Return the E.164 form of ``number`` or raise InvalidNumberError before any browser work"""
+    e164 = to_e164(number)
+    if (cache or get_number_cache()).status(e164) is False:
+        raise InvalidNumberError(f"{e164} is not on WhatsApp")
+    return e164
@@ -0,0 +1,40 @@
+import sys
+
+from config import settings
+
+QUIET_ZONE = 2  # Light modules around the code; scanners need a margin
+
+
+def render_qr(rows, invert=None):
+    """Render a QR module grid ('1' = dark) with half blocks, two module rows per line.
+
+    Terminals usually draw light text on a dark background, so by default
+    (QR_TERMINAL_INVERT) the light modules are drawn as blocks and the
+    terminal background shows through as the dark ones.
+    """
+    invert = settings.QR_TERMINAL_INVERT if invert is None else invert
+    width = len(rows[0]) + 2 * QUIET_ZONE
+    padded = ['0' * width] * QUIET_ZONE + ['0' * QUIET_ZONE + row + '0' * QUIET_ZONE for row in rows]
+    padded += ['0' * width] * (QUIET_ZONE + len(padded) % 2)
+    ink = '0' if invert else '1'
+    glyphs = {(True, True): '█', (True, False): '▀', (False, True): '▄', (False, False): ' '}
+    lines = []
+    for top, bottom in zip(padded[0::2], padded[1::2]):
+        lines.append(''.join(glyphs[(a == ink, b == ink)] for a, b in zip(top, bottom)))
+    return '\n'.join(lines)
+
+
+class QRDisplay:
+    """Prints the login QR and redraws it in place when WhatsApp rotates it"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.printed_lines = 0
+
+    def show(self, rows):
+        text = render_qr(rows) + '\n[!] Scan with WhatsApp > Linked devices (the code refreshes here)'
+        if self.printed_lines and self.stream.isatty():
+            self.stream.write(f"\x1b[{self.printed_lines}F\x1b[J")  # Back to the previous code and clear it
+        self.stream.write(text + '\n')
+        self.stream.flush()
+        self.printed_lines = text.count('\n') + 1
@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+
+from urllib3.exceptions import HTTPError as TransportError
+from selenium.common.exceptions import (
+    ElementClickInterceptedException, ElementNotInteractableException, InvalidSessionIdException,
+    JavascriptException, NoSuchElementException, NoSuchWindowException, StaleElementReferenceException,
+    TimeoutException, WebDriverException
+)
+
+from config import settings
+from src.utils.metrics import metrics
+from src.utils.phone import InvalidNumberError
+
+# Failure kinds, from cheapest to most expensive to recover from
+TRANSIENT = 'transient'  # Stale element, intercepted click: retry after a short backoff
+TIMEOUT = 'timeout'  # Page load or element wait ran out: not retried, counts toward the breaker
+INVALID_NUMBER = 'invalid_number'  # Recipient problem: never retried
+LOGGED_OUT = 'logged_out'  # QR screen instead of the app: needs a human, trips the breaker
+BROWSER_DEAD = 'browser_dead'  # Chrome/chromedriver gone: heal by restarting it, then retry
+PERMANENT = 'error'  # Anything else (missing file, bad input): not retried
+CIRCUIT_OPEN = 'circuit_open'
+
+TRANSIENT_ERRORS = (
+    StaleElementReferenceException, ElementClickInterceptedException, ElementNotInteractableException,
+    NoSuchElementException, JavascriptException
+)
+# TransportError: the HTTP connection to chromedriver failed
+DEAD_ERRORS = (InvalidSessionIdException, NoSuchWindowException, ConnectionError, TransportError)
+
+
+class SessionLoggedOutError(RuntimeError):
+    """WhatsApp shows the QR login screen; the linked session is gone"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Failing fast: the browser session is known to be down"""
+
+
+def classify_failure(exc):
+    """Failure kind of an exception, from its type alone (see WhatsAppClient._classify for probes)"""
+    if isinstance(exc, InvalidNumberError):
+        return INVALID_NUMBER
+    if isinstance(exc, SessionLoggedOutError):
+        return LOGGED_OUT
+    if isinstance(exc, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(exc, DEAD_ERRORS):
+        return BROWSER_DEAD
+    if isinstance(exc, TimeoutException):
+        # Retrying a full element wait multiplies the stall (stale selector, dead page)
+        return TIMEOUT
+    if isinstance(exc, TRANSIENT_ERRORS):
+        return TRANSIENT
+    if isinstance(exc, WebDriverException):
+        return TRANSIENT  # Unknown driver error; the client probes whether the browser survived
+    return PERMANENT
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for retry number ``attempt`` (1-based)"""
+    ceiling = min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Closed -> open after BREAKER_THRESHOLD failed operations in a row, or at once on trip().
+
+    While open, check() raises CircuitOpenError without touching the
+    browser. After BREAKER_RESET_TIMEOUT one trial operation is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name='client', threshold=None, reset_timeout=None):
+        self.name = name
+        self.threshold = threshold or settings.BREAKER_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.BREAKER_RESET_TIMEOUT
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.reason = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if now - self.opened_at >= self.reset_timeout else 'open'
+
+    def check(self):
+        """Raise CircuitOpenError unless an operation may run now"""
+        with self.lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self.trial_running:
+                self.trial_running = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        metrics.inc('breaker_rejected_total', breaker=self.name)
+        raise CircuitOpenError(f"Session unavailable ({self.reason}); failing fast, next try in {retry_in:.0f}s")
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"[✓] Circuit {self.name} closed, session healthy again")
+            self.failures = 0
+            self.opened_at = None
+            self.reason = None
+            self.trial_running = False
+
+    def record_failure(self, reason):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                self._open(reason)
+
+    def release(self):
+        """End a trial that said nothing about the session (e.g. a missing file)"""
+        with self.lock:
+            self.trial_running = False
+
+    def trip(self, reason):
+        with self.lock:
+            self._open(reason)
+
+    def _open(self, reason):
+        if self.opened_at is None or self.trial_running:
+            print(f"[!] Circuit {self.name} open ({reason}); failing fast for {self.reset_timeout}s")
+            metrics.inc('breaker_open_total', breaker=self.name, reason=reason)
+        self.opened_at = time.monotonic()
+        self.reason = reason
+        self.trial_running = False
@@ -0,0 +1,98 @@
+import threading
+
+from selenium.webdriver.common.by import By
+
+from config import settings
+from src.utils.metrics import metrics
+from src.utils.page_scripts import SELECTOR_CHECK_JS
+
+XPATH_PREFIX = 'xpath:'
+STARTUP_ELEMENTS = ('new_chat', 'chat_search')  # Expected on the chat list right after login
+
+
+def compile_candidate(candidate):
+    """'xpath://div' -> ('xpath', '//div'); bare XPaths are detected, anything else is CSS"""
+    if candidate.startswith(XPATH_PREFIX):
+        return 'xpath', candidate[len(XPATH_PREFIX):]
+    if candidate.startswith(('/', '(')):
+        return 'xpath', candidate
+    return 'css', candidate
+
+
+class SelectorRegistry:
+    """Logical element names -> ordered locator candidates (settings.SELECTORS).
+
+    Candidates are compiled once into (kind, expression) pairs that page
+    scripts evaluate directly. CSS goes through querySelector, which is
+    cheaper than XPath. The candidate that matched last moves to the front,
+    so after WhatsApp ships new markup, only the first lookup pays for the
+    candidates that no longer match. A name that is not registered is used
+    as a single raw selector.
+    """
+
+    def __init__(self, selectors=None):
+        self.lock = threading.Lock()
+        # Each value is an immutable tuple that record() swaps for a reordered one,
+        # so readers never see a list mid-reorder
+        self.compiled = {name: tuple(compile_candidate(c) for c in candidates)
+                         for name, candidates in (selectors or settings.SELECTORS).items()}
+        self.fallbacks_reported = set()
+
+    def candidates(self, target):
+        """Current candidate order for a name (or raw selector), as JSON-ready [kind, expr] lists"""
+        compiled = self.compiled.get(target)
+        if compiled is None:
+            return [list(compile_candidate(target))]
+        return [list(pair) for pair in compiled]
+
+    def record(self, target, candidate):
+        """Note that ``candidate`` (a [kind, expr] pair from candidates()) matched ``target``"""
+        if target not in self.compiled:
+            return
+        winner = tuple(candidate)
+        with self.lock:
+            compiled = self.compiled[target]
+            if compiled[0] == winner or winner not in compiled:
+                return
+            self.compiled[target] = (winner,) + tuple(pair for pair in compiled if pair != winner)
+        metrics.inc('selector_fallback_total', element=target)
+        if target not in self.fallbacks_reported:
+            self.fallbacks_reported.add(target)
+            print(f"[!] Selector '{target}' matched fallback {winner[1]!r}; using it first from now on")
+
+    def locators(self, target):
+        """(By, expression) pairs for find_element(s), in candidate order"""
+        return [(By.XPATH if kind == 'xpath' else By.CSS_SELECTOR, expr) for kind, expr in self.candidates(target)]
+
+    def present(self, driver, target):
+        """True when any candidate matches right now (no waiting)"""
+        for candidate in self.candidates(target):
+            by = By.XPATH if candidate[0] == 'xpath' else By.CSS_SELECTOR
+            if driver.find_elements(by, candidate[1]):
+                self.record(target, candidate)
+                return True
+        return False
+
+    def self_check(self, driver, expected=STARTUP_ELEMENTS):
+        """Validate every candidate in one script call and prefer whichever matches now.
+
+        Prints malformed candidates and ``expected`` elements that no
+        candidate finds. Returns {name: {'match': index or -1, 'invalid': [...]}}.
+        """
+        registry = {name: self.candidates(name) for name in self.compiled}
+        report = driver.execute_script(SELECTOR_CHECK_JS, registry)
+        for name, entry in report.items():
+            order = registry[name]
+            for index in entry['invalid']:
+                print(f"[!] Selector '{name}' candidate {order[index][1]!r} is not valid {order[index][0]}")
+            if entry['match'] >= 0:
+                self.record(name, order[entry['match']])
+        missing = [name for name in expected if report.get(name, {}).get('match', -1) < 0]
+        if missing:
+            print(f"[!] No selector candidate matches: {', '.join(missing)} (WhatsApp markup may have changed)")
+        resolved = sum(1 for entry in report.values() if entry['match'] >= 0)
+        print(f"[✓] Selectors checked: {resolved}/{len(report)} elements on screen")
+        return report
+
+
+selectors = SelectorRegistry()
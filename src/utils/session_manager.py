@@ -1,6 +1,10 @@
+import json
 import pickle
 import os
 
+from config import settings
+from src.utils.page_scripts import STORAGE_SNAPSHOT_JS, STORAGE_RESTORE_JS
+
 def save_session(driver, path):
     cookies = driver.get_cookies()
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -12,3 +16,25 @@ def load_session(driver, path):
         cookies = pickle.load(file)
         for cookie in cookies:
             driver.add_cookie(cookie)
+
+def save_storage(driver, path):
+    """Snapshot the page origin's localStorage and auth IndexedDB databases to a JSON file"""
+    driver.set_script_timeout(settings.TIMEOUTS['storage_snapshot'])
+    snapshot = driver.execute_async_script(STORAGE_SNAPSHOT_JS, settings.STORAGE_SNAPSHOT_DATABASES)
+    if 'error' in snapshot:
+        raise RuntimeError(f"Storage snapshot failed: {snapshot['error']}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(snapshot, file)
+    os.replace(temp_path, path)  # Never leave a half-written snapshot behind
+    return snapshot['skipped']
+
+def load_storage(driver, path):
+    """Write a save_storage() snapshot into the origin currently loaded in the driver"""
+    with open(path, 'r', encoding='utf-8') as file:
+        snapshot = json.load(file)
+    driver.set_script_timeout(settings.TIMEOUTS['storage_snapshot'])
+    result = driver.execute_async_script(STORAGE_RESTORE_JS, snapshot)
+    if isinstance(result, dict) and 'error' in result:
+        raise RuntimeError(f"Storage restore failed: {result['error']}")
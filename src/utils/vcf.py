@@ -0,0 +1,171 @@
+"""Streaming vCard (.vcf) reader and writer.
+
+Import reads the file in blocks cut at END:VCARD boundaries and parses
+the blocks in a process pool, keeping only a few blocks in flight. Memory therefore stays bounded whatever the file size.
+Export writes cards straight to the output file without building vCard
+objects.
+"""
+import os
+import quopri
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_CARDS = 2000
+BLOCK_BYTES = 4 << 20  # Text handed to one parser process at a time
+INLINE_PARSE_BYTES = 1 << 20  # Smaller files are parsed in-process, a pool costs more than it saves
+
+CARD = re.compile(r"^BEGIN:VCARD[ \t\r]*$(.*?)^END:VCARD[ \t\r]*$", re.I | re.M | re.S)
+
+
+def iter_card_blocks(path, block_bytes=BLOCK_BYTES):
+    """Yield text blocks that each end on a card boundary"""
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        tail = ''
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                if tail:
+                    yield tail
+                return
+            block = tail + data
+            cut = block.upper().rfind('END:VCARD')
+            if cut < 0:
+                tail = block
+                continue
+            cut = block.find('\n', cut)
+            if cut < 0:
+                tail = block  # Boundary line not complete yet
+                continue
+            yield block[:cut + 1]
+            tail = block[cut + 1:]
+
+
+def _unescape(value):
+    if '\\' not in value:
+        return value
+    return (value.replace('\\n', ' ').replace('\\N', ' ').replace('\\,', ',')
+            .replace('\\;', ';').replace('\\\\', '\\'))
+
+
+def _unfold(text):
+    """Join folded lines (RFC 6350 whitespace folding and vCard 2.1 quoted-printable soft breaks)"""
+    lines = []
+    for raw in text.splitlines():
+        if lines and raw[:1] in (' ', '\t'):
+            lines[-1] += raw[1:]
+        elif lines and lines[-1][-1:] == '=' and 'QUOTED-PRINTABLE' in lines[-1].upper():
+            lines[-1] = lines[-1][:-1] + raw
+        elif raw:
+            lines.append(raw)
+    return lines
+
+
+def _tel_type(params):
+    for param in params:
+        param = param[5:] if param.startswith('TYPE=') else param
+        for candidate in param.split(','):
+            if candidate and candidate not in ('PREF', 'VOICE') and '=' not in candidate:
+                return candidate.lower()
+    return None
+
+
+def parse_card(text):
+    """Return (name, [(number, type), ...]) for one vCard, keeping every TEL"""
+    full_name = None
+    structured_name = None
+    numbers = []
+    for line in _unfold(text):
+        head, sep, value = line.partition(':')
+        if not sep:
+            continue
+        parts = head.split(';')
+        prop = parts[0].rsplit('.', 1)[-1].upper()  # Drop "item1." style groups
+        if prop not in ('FN', 'N', 'TEL'):
+            continue
+        params = [p.upper() for p in parts[1:]]
+        if 'ENCODING=QUOTED-PRINTABLE' in params or 'QUOTED-PRINTABLE' in params:
+            value = quopri.decodestring(value.encode('latin-1', 'replace')).decode('utf-8', 'replace')
+
+        if prop == 'FN':
+            full_name = _unescape(value).strip()
+        elif prop == 'N':
+            structured_name = structured_name or value
+        else:
+            number = value.strip()
+            if number[:4].lower() == 'tel:':
+                number = number[4:]
+            if number.startswith('+'):
+                number = number.replace(' ', '')  # Normalize the number
+            if number:
+                numbers.append((number, _tel_type(params)))
+
+    if not full_name and structured_name:
+        # N is Family;Given;Additional;Prefix;Suffix
+        fields = [_unescape(f).strip() for f in structured_name.split(';')[:2]]
+        full_name = ' '.join(f for f in reversed(fields) if f)
+    return full_name or None, numbers
+
+
+def parse_block(text):
+    """Parse every card in a block of VCF text; runs in worker processes"""
+    return [parse_card(match.group(1)) for match in CARD.finditer(text)]
+
+
+def iter_vcf_contacts(path, workers=None):
+    """Yield (name, [(number, type), ...]) for every card in the file, in file order"""
+    if os.path.getsize(path) < INLINE_PARSE_BYTES or workers == 1:
+        for block in iter_card_blocks(path):
+            yield from parse_block(block)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for block in iter_card_blocks(path):
+            pending.append(pool.submit(parse_block, block))
+            if len(pending) >= workers * 2:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace(',', '\\,').replace(';', '\\;')
+            .replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 6350 asks"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    pieces = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Never split inside a UTF-8 sequence
+        pieces.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # Continuation lines start with a space
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def format_card(name, number):
+    return ('BEGIN:VCARD\r\nVERSION:3.0\r\n' + _fold('FN:' + _escape(name))
+            + _fold('TEL:' + _escape(number)) + 'END:VCARD\r\n')
+
+
+def write_vcf(path, contacts):
+    """Write (name, number) pairs as vCard 3.0; returns the number of cards"""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        buffer = []
+        for name, number in contacts:
+            buffer.append(format_card(name, number))
+            count += 1
+            if len(buffer) >= CHUNK_CARDS:
+                f.write(''.join(buffer))
+                buffer = []
+        f.write(''.join(buffer))
+    return count
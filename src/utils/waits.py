@@ -0,0 +1,133 @@
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, JavascriptException
+
+from config import settings
+from src.utils.metrics import metrics
+from src.utils.page_scripts import FIND_JS
+from src.utils.selectors import selectors
+
+# Resolves as soon as one of the targets matches an element in the requested
+# state. Each target is a list of [kind, expr] candidates (see
+# src.utils.selectors); the result is [targetIndex, element, candidateIndex].
+# A MutationObserver re-checks on every DOM change, so there is no polling
+# interval between the element appearing and Python seeing it.
+OBSERVER_WAIT_JS = FIND_JS + """
+const [targets, state, timeoutMs, done] = arguments;
+function visible(el) {
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+function ready(el) {
+    if (state === 'clickable') {
+        const button = el.closest('button') || el;
+        return visible(el) && !button.disabled && button.getAttribute('aria-disabled') !== 'true';
+    }
+    return true;
+}
+function find(candidate) {
+    try {
+        return findOne(candidate[0], candidate[1]);
+    } catch (e) {
+        return null;  // Malformed candidate; the startup self-check reports it
+    }
+}
+function probe() {
+    let anyVisible = false;
+    for (let i = 0; i < targets.length; i++) {
+        for (let j = 0; j < targets[i].length; j++) {
+            const el = find(targets[i][j]);
+            if (state === 'gone') {
+                if (el && visible(el)) anyVisible = true;
+            } else if (el && ready(el)) {
+                return [i, el, j];
+            }
+        }
+    }
+    return (state === 'gone' && !anyVisible) ? [-1, null, -1] : null;
+}
+const hit = probe();
+if (hit) { done(hit); return; }
+let finished = false;
+const observer = new MutationObserver(() => {
+    const found = probe();
+    if (found && !finished) { finished = true; observer.disconnect(); done(found); }
+});
+observer.observe(document, {
+    childList: true, subtree: true, attributes: true,
+    attributeFilter: ['style', 'class', 'hidden', 'disabled', 'aria-disabled']
+});
+setTimeout(() => {
+    if (!finished) { finished = true; observer.disconnect(); done(null); }
+}, timeoutMs);
+"""
+
+POLL_CONDITIONS = {
+    'present': EC.presence_of_element_located,
+    'clickable': EC.element_to_be_clickable,
+    'gone': EC.invisibility_of_element_located
+}
+
+
+def _poll_any(driver, targets, timeout, state):
+    """Classic WebDriverWait path, kept for settings.WAIT_STRATEGY = 'poll'"""
+    locators = [selectors.locators(target) for target in targets]
+    conditions = [POLL_CONDITIONS[state](locator) for group in locators for locator in group]
+    if state == 'gone':
+        WebDriverWait(driver, timeout).until(EC.all_of(*conditions))
+        return -1, None
+    element = WebDriverWait(driver, timeout).until(EC.any_of(*conditions))
+    for index, group in enumerate(locators):
+        for locator in group:
+            if element in driver.find_elements(*locator):
+                selectors.record(targets[index], ['xpath' if locator[0] == By.XPATH else 'css', locator[1]])
+                return index, element
+    return 0, element
+
+
+def wait_for_any(driver, targets, timeout, state='present'):
+    """Wait until one of several elements matches; returns (index, element).
+
+    ``targets`` are names from settings.SELECTORS (or raw selectors); each
+    one matches through any of its candidates. ``state`` is 'present',
+    'clickable' or 'gone' (no target matches a visible element; element is
+    None then).
+    """
+    with metrics.timer('wait', strategy=settings.WAIT_STRATEGY, state=state):
+        if settings.WAIT_STRATEGY == 'poll':
+            return _poll_any(driver, targets, timeout, state)
+        return _observe_any(driver, targets, timeout, state)
+
+
+def _observe_any(driver, targets, timeout, state):
+    deadline = time.monotonic() + timeout
+    driver.set_script_timeout(timeout + 5)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        candidates = [selectors.candidates(target) for target in targets]
+        try:
+            result = driver.execute_async_script(OBSERVER_WAIT_JS, candidates, state, int(remaining * 1000))
+        except JavascriptException:
+            # Document was replaced while waiting (navigation); observe the new one
+            time.sleep(0.05)
+            continue
+        if result:
+            index, element, candidate = result
+            if index >= 0:
+                selectors.record(targets[index], candidates[index][candidate])
+            return index, element
+        break
+    raise TimeoutException(f"Timed out after {timeout}s waiting for {state} element: {' | '.join(targets)}")
+
+
+def wait_for(driver, target, timeout, state='present'):
+    """Wait for a single element (name or selector) and return it"""
+    return wait_for_any(driver, [target], timeout, state)[1]
+
+
+def wait_until_gone(driver, target, timeout):
+    """Wait until the element no longer matches anything visible"""
+    wait_for_any(driver, [target], timeout, state='gone')
@@ -1,17 +1,18 @@
 import os
 import sys
+import base64
 import threading
 import time
 import random
-import subprocess
-from PIL import Image
+import itertools
+import queue
+from urllib.parse import quote
+from collections import OrderedDict
+from contextlib import contextmanager
 from selenium_stealth import stealth
 from selenium.webdriver.chrome.service import Service
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, JavascriptException, WebDriverException
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 
@@ -20,22 +21,66 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 try:
     from config import settings
-    from src.utils.session_manager import save_session, load_session
+    from src.utils.session_manager import save_session, load_session, save_storage, load_storage
     from src.utils.error_handlers import handle_error
+    from src.utils.log import add_context, get_logger
     from src.utils.file_handlers import get_media_path
+    from src.utils.outbox import Outbox
+    from src.utils.message_store import MessageStore
+    from src.utils.phone import InvalidNumberError, check_number, get_number_cache
+    from src.utils.metrics import TimedLock, instrument_driver, metrics, timed
+    from src.utils.media import MediaPipeline, extension_for, format_rate
+    from src.utils.navigation import ChatNavigator
+    from src.utils.qr_terminal import QRDisplay
+    from src.utils.selectors import selectors
+    from src.utils.resilience import (
+        BROWSER_DEAD, CIRCUIT_OPEN, INVALID_NUMBER, LOGGED_OUT, PERMANENT, TIMEOUT, TRANSIENT,
+        CircuitBreaker, CircuitOpenError, SessionLoggedOutError, backoff_delay, classify_failure
+    )
+    from src.utils.waits import wait_for, wait_for_any
+    from src.utils.page_scripts import (
+        MONITOR_INSTALL_JS, MONITOR_DRAIN_JS, EXTRACT_MESSAGES_JS, LOAD_OLDER_MESSAGES_JS, COLLECT_MEDIA_JS,
+        QR_READ_JS
+    )
     print("[✓] Configuration and utilities imported successfully")
 except ImportError as e:
     print(f"[×] Critical import error: {e}")
     raise
 
 class WhatsAppClient:
-    def __init__(self):
+    def __init__(self, profile_dir=None, cookies_path=None, outbox_path=None, storage_path=None):
         self.driver = None
         self.running = True
-        self.lock = threading.Lock()
-        self.last_messages = {}
-        self.setup_driver()
-        self.login()
+        self.lock = TimedLock('client')
+        self.last_messages = OrderedDict()  # Seen message ids, bounded by MONITOR_SEEN_LIMIT
+        self.message_callbacks = []
+        self.subscribers = []
+        self.current_chat = None
+        self.chat_keys = OrderedDict()  # Phone digits -> the name chats are stored under (see _chat_key)
+        self.profile_dir = profile_dir or (settings.PATHS['profile'] if settings.PERSIST_PROFILE else None)
+        self.cookies_path = cookies_path or settings.PATHS['cookies']
+        self.storage_path = storage_path or settings.PATHS['storage']
+        self.outbox = Outbox(outbox_path or settings.PATHS['outbox'])
+        self.store = MessageStore(settings.PATHS['messages_db'])
+        self.numbers = get_number_cache()
+        self.media = MediaPipeline()
+        self.breaker = CircuitBreaker()
+        self.attempt = threading.local()  # attempt.committed: this thread's try pressed send, never retry it
+        self.heap_mb = None  # Last JS heap reading, see check_memory()
+        self.next_memory_check = time.monotonic() + settings.MEMORY_CHECK_INTERVAL
+
+        started = time.perf_counter()
+        with metrics.timer('setup_driver'):
+            self.setup_driver()
+        with metrics.timer('restore_session'):
+            warm = self.try_restore_session()
+        if not warm:
+            with metrics.timer('login'):
+                self.login()
+        self.check_selectors()
+        self.startup_time = time.perf_counter() - started
+        print(f"[✓] Client ready in {self.startup_time:.1f}s ({'warm start' if warm else 'QR login'})")
+        get_logger().info("Client ready", extra={'fields': {'duration': round(self.startup_time, 3), 'warm': warm}})
         self.start_message_monitor()
     # Existing methods remain unchanged...
 
@@ -48,8 +93,8 @@ class WhatsAppClient:
         desktop_ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
         options.add_argument(f"user-agent={desktop_ua}")
         
-        # Desktop viewport configuration
-        options.add_argument("--window-size=1920,1080")
+        # Desktop viewport configuration; lean mode renders less of the chat list
+        options.add_argument("--window-size=1280,800" if settings.LEAN_MODE else "--window-size=1920,1080")
         
         # Headless mode settings
         if settings.HEADLESS:
@@ -60,11 +105,20 @@ class WhatsAppClient:
         options.add_argument("--disable-notifications")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
+        if settings.LEAN_MODE:
+            for flag in ("--disable-extensions", "--disable-background-networking", "--disable-component-update",
+                         "--disable-default-apps", "--disable-sync", "--mute-audio"):
+                options.add_argument(flag)
+        if self.profile_dir:
+            # Dedicated profile keeps WhatsApp's IndexedDB auth between launches
+            os.makedirs(self.profile_dir, exist_ok=True)
+            options.add_argument(f"--user-data-dir={os.path.abspath(self.profile_dir)}")
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option("useAutomationExtension", False)
 
         service = Service(settings.PATHS['driver'])
-        self.driver = webdriver.Chrome(service=service, options=options)
+        self.driver = instrument_driver(webdriver.Chrome(service=service, options=options))
+        self.navigator = ChatNavigator(self.driver)
         
         # Stealth configuration
         stealth(
@@ -87,34 +141,113 @@ class WhatsAppClient:
             }
         )
 
+        # Message observer is live from the first paint of every page
+        self.driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": MONITOR_INSTALL_JS}
+        )
+
+        self.driver.execute_cdp_cmd("Performance.enable", {})  # Heap readings for check_memory()
+        if settings.LEAN_MODE:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self._block_urls(allow_media=False)
+            # WhatsApp honours reduced motion, which skips its transition animations
+            self.driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {
+                "features": [{"name": "prefers-reduced-motion", "value": "reduce"}]
+            })
+
+    def _block_urls(self, allow_media):
+        patterns = list(settings.LEAN_BLOCKED_URLS)
+        if not allow_media:
+            patterns += settings.LEAN_MEDIA_URLS
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+    @contextmanager
+    def media_allowed(self):
+        """Let images and media load for the duration of the block (lean mode blocks them otherwise)"""
+        if not settings.LEAN_MODE:
+            yield
+            return
+        self._block_urls(allow_media=True)
+        try:
+            yield
+        finally:
+            self._block_urls(allow_media=False)
+
+    def heap_usage_mb(self):
+        """Used JS heap of the page in MB, from the CDP Performance domain"""
+        result = self.driver.execute_cdp_cmd("Performance.getMetrics", {})
+        values = {m['name']: m['value'] for m in result['metrics']}
+        return values.get('JSHeapUsedSize', 0) / (1024 * 1024)
+
+    def check_memory(self):
+        """Recycle the browser when its heap exceeds MEMORY_BUDGET_MB; the caller holds the lock.
+
+        Runs on the monitor thread, so an expired session never waits for a
+        QR scan here: the breaker opens instead, like after a failed heal.
+        """
+        self.next_memory_check = time.monotonic() + settings.MEMORY_CHECK_INTERVAL
+        self.heap_mb = self.heap_usage_mb()
+        if self.heap_mb > settings.MEMORY_BUDGET_MB:
+            print(f"[!] Browser heap at {self.heap_mb:.0f} MB, over the {settings.MEMORY_BUDGET_MB} MB budget")
+            try:
+                self.recycle_browser(allow_login=False)
+            except Exception as e:
+                kind = LOGGED_OUT if isinstance(e, SessionLoggedOutError) else BROWSER_DEAD
+                handle_error(f"Browser recycle failed: {str(e)}", kind=kind)
+                self.breaker.trip(kind)
+
+    def recycle_browser(self, allow_login=True):
+        """Restart Chrome and restore the session; the caller holds the lock.
+
+        Without ``allow_login`` an expired session raises SessionLoggedOutError
+        instead of waiting for a QR scan.
+        """
+        with metrics.timer('browser_recycle'):
+            try:
+                # A persistent profile already keeps the storage; skip the heavy snapshot
+                self.save_session_state(storage=self.profile_dir is None)
+            except Exception as e:
+                handle_error(f"Session save before recycle failed: {str(e)}")
+            try:
+                self.driver.quit()
+            except Exception:
+                pass  # Already gone
+            self.current_chat = None
+            self.setup_driver()
+            if not self.try_restore_session():
+                if not allow_login:
+                    raise SessionLoggedOutError("Session could not be restored after restarting the browser")
+                self.login()
+        get_logger().info("Browser recycled", extra={'fields': {'heap_mb': self.heap_mb}})
+        self.heap_mb = None
+        print("[✓] Browser recycled, session restored")
+
     def human_delay(self, min=0.5, max=2.0):
-        """Randomized human delay system"""
-        time.sleep(random.uniform(min, max))
+        """Randomized human delay system, only active with settings.HUMANIZE"""
+        if settings.HUMANIZE:
+            time.sleep(random.uniform(min, max))
 
     def login(self):
         """Desktop-optimized authentication flow"""
         try:
             # Force desktop version with URL parameter
-            self.driver.get("https://web.whatsapp.com/?desktop")
+            self.driver.get(f"{settings.WHATSAPP_URL}/?desktop")
             print("[•] Loading WhatsApp Desktop Web...")
 
             print("[!] Waiting for QR code...")
-            qr_element = WebDriverWait(self.driver, settings.TIMEOUTS['qr_scan']).until(
-                EC.presence_of_element_located((By.XPATH, "//canvas[@aria-label='Scan this QR code to link a device!']"))
+            found, _ = wait_for_any(
+                self.driver, ['qr_canvas', 'new_chat'], settings.TIMEOUTS['qr_scan']
             )
+            if found == 1:
+                # Profile directory already holds a linked session
+                print("[✓] Existing desktop session reused")
+                return
             
-            self.display_terminal_qr_simple(qr_element)
-            self.display_terminal_qr_advanced(qr_element)
-            
-            WebDriverWait(self.driver, settings.TIMEOUTS['qr_scan']).until(
-                EC.invisibility_of_element_located((By.XPATH, "//canvas[@aria-label='Scan this QR code to link a device!']"))
-            )
+            self.show_qr_until_scanned()
             print("\n[✓] Desktop authentication successful!")
 
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, settings.XPATHS['new_chat']))
-            )
-            save_session(self.driver, settings.PATHS['cookies'])
+            wait_for(self.driver, 'new_chat', 20)
+            self.save_session_state()
             print("[✓] Desktop session saved")
 
         except TimeoutException as e:
@@ -122,187 +255,628 @@ class WhatsAppClient:
         except Exception as e:
             handle_error(f"Login failed: {str(e)}", fatal=True)
 
-    def try_restore_session(self):
-        """Session restoration with desktop validation"""
-        if not os.path.exists(settings.PATHS['cookies']):
-            return False
+    def check_selectors(self):
+        """Startup self-check of settings.SELECTORS against the chat list (one script call)"""
+        try:
+            with metrics.timer('selector_check'):
+                return selectors.self_check(self.driver)
+        except WebDriverException as e:
+            handle_error(f"Selector self-check failed: {str(e)}")
+            return None
 
-        print("[•] Found existing session cookies")
-        load_session(self.driver, settings.PATHS['cookies'])
-        self.driver.get("https://web.whatsapp.com/?desktop")  # Reload desktop version
-        
+    def _session_probe(self):
+        """Cheap DOM probe: True once the chat list renders, False on the QR screen"""
         try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@data-testid='chat-list-search']"))
+            found, _ = wait_for_any(
+                self.driver,
+                ['qr_canvas', 'chat_list_search', 'new_chat'],
+                settings.TIMEOUTS['session_probe']
             )
-            print("[✓] Desktop session restored")
-            return True
+            return found > 0
         except TimeoutException:
-            print("[!] Session expired or mobile interface detected")
-            os.remove(settings.PATHS['cookies'])
             return False
 
-    # Existing methods below remain unchanged but benefit from new configurations
-    # -------------------------------------------------------------------------
+    def try_restore_session(self):
+        """Warm start from the persistent profile, then from the saved snapshot"""
+        self.driver.get(f"{settings.WHATSAPP_URL}/?desktop")
+        if self._session_probe():
+            print("[✓] Desktop session restored from profile")
+            return True
 
-    def display_terminal_qr_simple(self, qr_element):
-        """Simple approach: Save QR as image file"""
-        try:
-            qr_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp')
-            os.makedirs(qr_dir, exist_ok=True)
-            qr_path = os.path.join(qr_dir, 'whatsapp_qr.png')
-            
-            qr_element.screenshot(qr_path)
-            
-            print("\n[✓] QR CODE APPROACH 1:")
-            print(f"[✓] QR Code saved as '{qr_path}'")
-            print("[!] Please scan the QR code image with your WhatsApp mobile app")
-            print("[!] Waiting for scan...\n")
-        except Exception as e:
-            print(f"[!] Error saving QR code: {e}")
+        has_cookies = os.path.exists(self.cookies_path)
+        has_storage = os.path.exists(self.storage_path)
+        if not (has_cookies or has_storage):
+            return False
 
-    def display_terminal_qr_advanced(self, qr_element):
-        """Advanced approach using zbarimg + qrencode"""
+        print("[•] Found saved session snapshot")
         try:
-            print("[✓] QR CODE APPROACH 2:")
-            temp_qr = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'temp_qr.png')
-            qr_element.screenshot(temp_qr)
-            
-            try:
-                # Extract QR data using zbarimg
-                result = subprocess.check_output(
-                    ['zbarimg', '--quiet', '-Sdisable', '-Sqrcode.enable', temp_qr],
-                    stderr=subprocess.STDOUT
-                ).decode().strip()
-                
-                if not result.startswith('QR-Code:'):
-                    raise ValueError("QR data not found")
-
-                qr_data = result.split(':', 1)[1]
-                
-                # Generate terminal QR using qrencode
-                print("\nTerminal QR Code (scan with WhatsApp):")
-                subprocess.run(['qrencode', '-t', 'UTF8', '-o', '-', qr_data])
-                print(f"\nQR Data: {qr_data}")
-                print("[!] If terminal QR doesn't scan, use the saved image file")
-                
-            except Exception as e:
-                print(f"[!] Error generating terminal QR: {e}")
-                self.fallback_ascii_qr(temp_qr)
-                
+            if has_cookies:
+                load_session(self.driver, self.cookies_path)
+            if has_storage:
+                # Static same-origin resource, so the storage is in place before the app boots
+                self.driver.get(f"{settings.WHATSAPP_URL}/favicon.ico")
+                load_storage(self.driver, self.storage_path)
         except Exception as e:
-            print(f"[!] Error rendering terminal QR: {e}")
-            print("[!] Please use the saved QR code image instead")
+            handle_error(f"Session snapshot restore failed: {str(e)}")
+            return False
+
+        self.driver.get(f"{settings.WHATSAPP_URL}/?desktop")  # Reload desktop version
+        if self._session_probe():
+            print("[✓] Desktop session restored from snapshot")
+            return True
+
+        print("[!] Session expired or mobile interface detected")
+        for path in (self.cookies_path, self.storage_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return False
 
-    def fallback_ascii_qr(self, temp_qr):
-        """Fallback to ASCII QR if system tools fail"""
+    def save_session_state(self, storage=True):
+        """Persist cookies plus a localStorage/IndexedDB snapshot for warm starts"""
+        save_session(self.driver, self.cookies_path)
+        if not storage:
+            return
         try:
-            img = Image.open(temp_qr)
-            img = img.resize((40, 40)).convert('L')
-            pixels = list(img.getdata())
-            
-            ascii_chars = ' ░▒▓█'
-            
-            border = '╔' + '═' * 42 + '╗'
-            print(f"\n{border}\n║ {'SCAN QR CODE':^40} ║")
-            print('╟' + '─' * 42 + '╢')
-            
-            for i in range(0, len(pixels), img.width):
-                line = '║ ' + ''.join([ascii_chars[min(p // 64, 4)] for p in pixels[i:i+img.width]]) + ' ║'
-                print(line)
-            
-            print('╚' + '═' * 42 + '╝')
+            skipped = save_storage(self.driver, self.storage_path)
+            if skipped:
+                print(f"[!] {skipped} non-exportable storage records rely on the Chrome profile")
         except Exception as e:
-            print("[!] All QR display methods failed - use saved image file")
+            handle_error(f"Storage snapshot failed: {str(e)}")
+
+    # Existing methods below remain unchanged but benefit from new configurations
+    # -------------------------------------------------------------------------
+
+    def show_qr_until_scanned(self):
+        """Draw the login QR in the terminal, redrawing it on each rotation, until it is scanned.
+
+        The canvas is read in-page once per change (one round trip each), and
+        the latest code is also saved as temp/whatsapp_qr.png.
+        """
+        qr_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'whatsapp_qr.png')
+        os.makedirs(os.path.dirname(qr_path), exist_ok=True)
+        display = QRDisplay()
+        key = None
+        deadline = time.monotonic() + settings.TIMEOUTS['qr_scan']
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(f"QR code not scanned within {settings.TIMEOUTS['qr_scan']}s")
+            wait_ms = int(min(remaining, 30) * 1000)
+            self.driver.set_script_timeout(wait_ms / 1000 + 5)
+            try:
+                state = self.driver.execute_async_script(QR_READ_JS, selectors.candidates('qr_canvas'), key, wait_ms)
+            except JavascriptException:
+                continue  # Page navigated away after the scan; read the new document
+            if state is None:
+                continue  # Same code still showing
+            if state.get('gone'):
+                return
+            key = state['key']
+            with open(qr_path, 'wb') as f:
+                f.write(base64.b64decode(state['png']))
+            display.show(state['rows'])
+            metrics.inc('qr_renders_total')
 
+    @timed('send_message')
     def send_message(self, number, message):
         """Desktop-optimized message sending"""
-        with self.lock:
-            try:
-                self.driver.get(f"{settings.WHATSAPP_URL}/send?phone={number}&text={message}")
-                self.human_delay(1, 2)
-                
-                send_btn = WebDriverWait(self.driver, settings.TIMEOUTS['element_wait']).until(
-                    EC.element_to_be_clickable((By.XPATH, settings.XPATHS['send_button']))
-                )
-                ActionChains(self.driver)\
-                    .move_to_element(send_btn)\
-                    .pause(0.2)\
-                    .click()\
-                    .perform()
+        try:
+            phone = self._resolve_number(number)
+        except InvalidNumberError as e:
+            handle_error(f"Message failed: {str(e)}", kind=INVALID_NUMBER)
+            return False
+
+        def attempt():
+            with self.lock:
+                self.current_chat = None
+                if self.navigator.switch(phone, 'message_box') is not None:
+                    self._type_message(message)  # Chat opened in-app, no reload
+                else:
+                    send_btn = self._load_chat(phone, 'send_button', text=message)
+                    actions = ActionChains(self.driver).move_to_element(send_btn)
+                    if settings.HUMANIZE:
+                        actions.pause(0.2)
+                    self.attempt.committed = True
+                    actions.click().perform()
+                self.current_chat = number
                 return True
-            except Exception as e:
-                handle_error(f"Message failed: {str(e)}")
-                return False
+        return bool(self._resilient('send_message', attempt, "Message failed"))
 
     def send_file(self, number, file_path, caption=""):
         """Desktop file upload flow"""
+        return self.send_files(number, [file_path], caption)
+
+    @timed('send_file')
+    def send_files(self, number, file_paths, caption=""):
+        """Send several files in one composer action.
+
+        Images and videos are compressed on the media threads while the
+        chat loads, and identical files are attached once.
+        """
+        try:
+            phone = self._resolve_number(number)
+        except InvalidNumberError as e:
+            handle_error(f"File send failed: {str(e)}", kind=INVALID_NUMBER)
+            return False
+        prepared = self.media.prepare([get_media_path(path, 'upload') for path in file_paths])
+
+        def attempt():
+            with self.lock:
+                self.current_chat = None
+                self._load_chat(phone, 'attach_button')
+                self._attach_files(self.media.ready(prepared), caption)
+                self.current_chat = number
+                return True
+        return bool(self._resilient('send_file', attempt, "File send failed"))
+
+    def _resilient(self, operation, attempt, label):
+        """Run attempt() with failure classification, retries and the circuit breaker.
+
+        Transient failures are retried up to RETRY_ATTEMPTS times with
+        backoff. A dead browser is restarted (auto-heal) before the retry.
+        Timeouts are not retried, since a stale selector or a dead page
+        would only time out again, but they count toward the breaker. A
+        logged-out session opens the breaker, so queued work fails fast
+        until it recovers. An attempt that already pressed send is never
+        retried, to avoid duplicate messages. Returns attempt()'s result, or
+        None once the failure is reported.
+        """
+        try:
+            self.breaker.check()
+        except CircuitOpenError as e:
+            handle_error(f"{label}: {str(e)}", kind=CIRCUIT_OPEN)
+            return None
+        for number in range(1, settings.RETRY_ATTEMPTS + 1):
+            add_context(attempt=number)
+            self.attempt.committed = False
+            try:
+                result = attempt()
+            except Exception as e:
+                retry = number < settings.RETRY_ATTEMPTS and not self.attempt.committed
+                kind, retry = self._record_failure(e, operation, retry)
+                if not retry:
+                    handle_error(f"{label}: {str(e)}", kind=kind)
+                    return None
+                self.current_chat = None  # Page state is unknown after a failure
+                delay = backoff_delay(number)
+                get_logger().warning(f"{label}, retrying in {delay:.1f}s: {str(e)}", extra={'fields': {'kind': kind}})
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _record_failure(self, exc, operation, retry=False):
+        """Classify a failure and update the breaker; returns (kind, whether to retry).
+
+        Must be called without the client lock held, since a dead browser is
+        healed here.
+        """
+        kind = self._classify(exc)
+        metrics.inc('failures_total', kind=kind, operation=operation)
+        if kind == CIRCUIT_OPEN:
+            return kind, False
+        if kind == INVALID_NUMBER:
+            self.breaker.record_success()  # The app answered, so the session is fine
+            return kind, False
+        if kind == PERMANENT:
+            self.breaker.release()
+            return kind, False
+        if kind == LOGGED_OUT or (kind == BROWSER_DEAD and not self._heal()):
+            self.breaker.trip(kind)
+            return kind, False
+        if kind == TIMEOUT:
+            retry = False
+        if not retry:
+            self.breaker.record_failure(kind)
+        return kind, retry
+
+    def _classify(self, exc):
+        """classify_failure() refined by probing the browser: dead, or showing the QR login screen"""
+        kind = classify_failure(exc)
+        if kind not in (TRANSIENT, TIMEOUT, PERMANENT) or not isinstance(exc, WebDriverException):
+            return kind
+        if not self.is_alive():
+            return BROWSER_DEAD
+        if kind == TIMEOUT and selectors.present(self.driver, 'qr_canvas'):
+            return LOGGED_OUT
+        return kind
+
+    def _heal(self):
+        """Restart a dead browser and restore its session; True when it is usable again"""
+        print("[!] Browser not responding, restarting it")
         with self.lock:
             try:
-                self.driver.get(f"{settings.WHATSAPP_URL}/send?phone={number}")
-                self.human_delay(1, 2)
-                
-                WebDriverWait(self.driver, settings.TIMEOUTS['element_wait']).until(
-                    EC.element_to_be_clickable((By.XPATH, settings.XPATHS['attach_button']))
-                ).click()
-                
-                file_input = WebDriverWait(self.driver, settings.TIMEOUTS['element_wait']).until(
-                    EC.presence_of_element_located((By.XPATH, settings.XPATHS['file_input']))
-                )
-                file_input.send_keys(get_media_path(file_path, 'upload'))
-                
-                if caption:
-                    WebDriverWait(self.driver, settings.TIMEOUTS['element_wait']).until(
-                        EC.presence_of_element_located((By.XPATH, settings.XPATHS['caption_box']))
-                    ).send_keys(caption)
-                    
-                WebDriverWait(self.driver, settings.TIMEOUTS['file_upload']).until(
-                    EC.element_to_be_clickable((By.XPATH, settings.XPATHS['send_button']))
-                ).click()
+                self.recycle_browser(allow_login=False)
+                metrics.inc('browser_heal_total', status='ok')
                 return True
             except Exception as e:
-                handle_error(f"File send failed: {str(e)}")
+                metrics.inc('browser_heal_total', status='failed')
+                handle_error(f"Browser restart failed: {str(e)}", kind=BROWSER_DEAD)
                 return False
-    def view_messages(self, contact_name_or_number):
-                    """View messages with timestamp and sender information."""
-                    with self.lock:
-                        try:
-                            # Open the chat for the specified contact
-                            self.driver.get(f"{settings.WHATSAPP_URL}/send?phone={contact_name_or_number}")
-                            self.human_delay(1, 2)
-                
-                            # Wait for the chat to load
-                            WebDriverWait(self.driver, settings.TIMEOUTS['element_wait']).until(
-                                EC.presence_of_element_located((By.XPATH, settings.XPATHS['chat_container']))
-                            )
-                            time.sleep(2)  # Allow messages to load
-                
-                            # Extract messages with their metadata
-                            message_elements = self.driver.find_elements(By.XPATH, "//div[@class='copyable-text']")
-                            print(f"\nMessages with {contact_name_or_number}:")
-                
-                            for message in message_elements:
-                                # Extract the timestamp and sender name from the attribute
-                                metadata = message.get_attribute("data-pre-plain-text")
-                                # Extract the message text
-                                message_text = message.find_element(By.XPATH, ".//span[@class='_ao3e selectable-text copyable-text']").text
-                
-                                # Print the metadata and message
-                                print(f"  {metadata}{message_text}")
-                
-                            return True
-                
-                        except Exception as e:
-                            handle_error(f"Failed to view messages: {str(e)}")
-                            return False
+
+    def _resolve_number(self, number):
+        """Digits for the send URL; malformed and known-unregistered numbers fail here, before any browser work"""
+        add_context(chat=number)
+        return check_number(number, self.numbers).lstrip('+')
+
+    def _load_chat(self, phone, ready, text=None):
+        """Open the chat for ``phone`` and wait until ``ready`` is clickable.
+
+        Recently used chats are switched to in-app (see ChatNavigator); others,
+        and any message prefilled through ``text``, load the send URL.
+        WhatsApp answers an unregistered number with an "invalid" dialog, which
+        is recorded in the number cache and raised as InvalidNumberError
+        instead of waiting out the full element timeout. The QR login screen
+        likewise raises SessionLoggedOutError at once.
+        """
+        if text is None:
+            element = self.navigator.switch(phone, ready)
+            if element is not None:
+                return element
+        start = time.perf_counter()
+        url = f"{settings.WHATSAPP_URL}/send?phone={phone}"
+        if text is not None:
+            url += f"&text={quote(text, safe='')}"  # &, #, % and + would cut or alter the message
+        self.navigator.current = None  # The reload replaces the open chat
+        self.driver.get(url)
+        self.human_delay(1, 2)
+        found, element = wait_for_any(
+            self.driver, [ready, 'invalid_number', 'qr_canvas'],
+            settings.TIMEOUTS['element_wait'], state='clickable'
+        )
+        if found == 2:
+            raise SessionLoggedOutError("WhatsApp shows the QR login screen")  # Instead of a 60s timeout
+        self.numbers.record('+' + phone, registered=found == 0)
+        if found == 1:
+            raise InvalidNumberError(f"+{phone} is not on WhatsApp")
+        self.navigator.loaded(phone, time.perf_counter() - start)
+        return element
+
+    def _attach_files(self, paths, caption=""):
+        """Attach files in one file-input action and send them in the currently open chat"""
+        wait_for(self.driver, 'attach_button',
+                 settings.TIMEOUTS['action'], state='clickable').click()
+
+        file_input = wait_for(self.driver, 'file_input', settings.TIMEOUTS['action'])
+        size = sum(os.path.getsize(path) for path in paths)
+        start = time.perf_counter()
+        file_input.send_keys("\n".join(paths))  # Newline-separated paths select several files at once
+
+        if caption:
+            wait_for(self.driver, 'caption_box', settings.TIMEOUTS['action']).send_keys(caption)
+
+        send_button = wait_for(self.driver, 'send_button', settings.TIMEOUTS['file_upload'],
+                               state='clickable')
+        self.attempt.committed = True
+        send_button.click()
+        elapsed = time.perf_counter() - start
+        metrics.inc('media_upload_bytes', size)
+        metrics.observe('media_upload_seconds', elapsed)
+        print(f"[✓] Attached {len(paths)} file(s): {format_rate(size, elapsed)}")
+
+    def _type_message(self, message):
+        """Type and submit a message in the currently open chat"""
+        message_box = wait_for(self.driver, 'message_box',
+                               settings.TIMEOUTS['action'], state='clickable')
+        for i, line in enumerate(message.split("\n")):
+            if i:
+                message_box.send_keys(Keys.SHIFT, Keys.ENTER)  # Newline without sending
+            message_box.send_keys(line)
+        self.attempt.committed = True
+        message_box.send_keys(Keys.ENTER)
+
+    def _open_chat(self, number):
+        """Open a chat, reusing it when it is already the active one"""
+        if self.current_chat == number:
+            return
+        phone = self._resolve_number(number)
+        self.current_chat = None
+        self._load_chat(phone, 'message_box')
+        self.current_chat = number
+        self.chat_keys[phone] = number
+        self.chat_keys.move_to_end(phone)
+        if len(self.chat_keys) > settings.MONITOR_SEEN_LIMIT:
+            self.chat_keys.popitem(last=False)
+
+    def enqueue(self, number, text=None, file_path=None, caption=""):
+        """Queue a message or file for the next flush() and return its id"""
+        if file_path:
+            return self.outbox.put(number, 'file', file_path=file_path, caption=caption)
+        return self.outbox.put(number, 'text', text=text or "")
+
+    @timed('flush')
+    def flush(self):
+        """Dispatch all queued items, opening each chat once per run of items.
+
+        Sent items leave the queue; failed ones stay pending with their
+        attempt count for the next flush (see _flush_chat for the ones that
+        are dropped), and items are not tried at all while the circuit is
+        open ('deferred'). The client lock is taken per
+        chat, so the monitor thread gets a turn between chats.
+        """
+        results = []
+        start = time.perf_counter()
+        pending = self.outbox.pending()
+        # Files are compressed on the media threads while earlier items are sent
+        prepared = {item['id']: self.media.prepare([get_media_path(item['file_path'], 'upload')])
+                    for item in pending if item['kind'] == 'file'}
+        for number, group in itertools.groupby(pending, key=lambda item: item['number']):
+            try:
+                self.breaker.check()  # Leave the rest queued while the session is down
+            except CircuitOpenError as e:
+                results.extend({'id': item['id'], 'number': number, 'kind': item['kind'], 'status': 'deferred',
+                                'error': str(e), 'attempts': item.get('attempts', 0), 'queued': True, 'elapsed': 0.0}
+                               for item in group)
+                continue
+            with self.lock:
+                chat_results, failures = self._flush_chat(number, list(group), prepared)
+            results.extend(chat_results)
+            # Same classification as single sends; a logout or repeated timeouts open the breaker
+            for exc in failures:
+                self._record_failure(exc, 'flush')
+            if not failures and chat_results:
+                self.breaker.record_success()
+
+        elapsed = time.perf_counter() - start
+        sent = sum(1 for r in results if r['status'] == 'sent')
+        report = {
+            'results': results,
+            'sent': sent,
+            'failed': len(results) - sent,
+            'pending': len(self.outbox),
+            'elapsed': elapsed,
+            'throughput': sent / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"[✓] Flushed {len(results)} queued items ({sent} sent, {report['failed']} failed, "
+              f"{report['pending']} still queued) at {report['throughput']:.2f} msgs/sec")
+        return report
+
+    def _flush_chat(self, number, group, prepared):
+        """Send one chat's run of queued items; returns (results, exceptions).
+
+        A failed item stays queued for the next flush unless its failure
+        cannot go away (invalid number, missing file), it has used up
+        OUTBOX_MAX_ATTEMPTS, or it already pressed send, in which case a
+        retry could deliver it twice. The caller holds the client lock and
+        classifies the exceptions once it has released it.
+        """
+        results, failures = [], []
+        try:
+            self._open_chat(number)
+            chat_exc = None
+        except Exception as e:
+            chat_exc = e
+            failures.append(e)
+            handle_error(f"Could not open chat {number}: {str(e)}")
+
+        for item in group:
+            item_start = time.perf_counter()
+            exc = chat_exc
+            self.attempt.committed = False
+            if exc is None:
+                try:
+                    if item['kind'] == 'file':
+                        self._attach_files(self.media.ready(prepared[item['id']]), item['caption'])
+                    else:
+                        self._type_message(item['text'])
+                except Exception as e:
+                    exc = e
+                    failures.append(e)
+                    handle_error(f"Queued {item['kind']} to {number} failed: {str(e)}")
+                    self.current_chat = None  # Composer state is unknown, reopen next time
+            queued = False
+            if exc is None:
+                self.outbox.mark_done(item['id'])
+                attempts = item.get('attempts', 0) + 1
+            else:
+                attempts = self.outbox.mark_failed(item['id'], str(exc))
+                final = (self.attempt.committed or attempts >= settings.OUTBOX_MAX_ATTEMPTS
+                         or classify_failure(exc) in (INVALID_NUMBER, PERMANENT))
+                if final:
+                    self.outbox.mark_done(item['id'], status='failed')
+                queued = not final
+            results.append({
+                'id': item['id'],
+                'number': number,
+                'kind': item['kind'],
+                'status': 'failed' if exc else 'sent',
+                'error': str(exc) if exc else None,
+                'attempts': attempts,
+                'queued': queued,  # Failed but retried by the next flush
+                'elapsed': time.perf_counter() - item_start
+            })
+        return results, failures
+
+    def iter_chat_messages(self, contact_name_or_number, chunk_size=None, history_pages=0, after_id=None):
+        """Yield a chat's messages, oldest first, in lists of at most chunk_size records.
+
+        Each record is a dict with id, chat, sender, timestamp, text and
+        incoming. ``history_pages`` scrolls up that many times first so
+        WhatsApp renders older history; ``after_id`` skips everything up to
+        and including that message when it is still rendered. Every chunk
+        costs one execute_script.
+        """
+        chunk_size = chunk_size or settings.VIEW_CHUNK_SIZE
+        with self.lock:
+            self._open_chat(contact_name_or_number)
+            wait_for(self.driver, 'chat_container', settings.TIMEOUTS['element_wait'])
+            try:
+                # Resolves on the first rendered message instead of a fixed sleep
+                wait_for(self.driver, 'message_row', settings.TIMEOUTS['messages_settle'])
+            except TimeoutException:
+                return  # Empty chat
+            for _ in range(history_pages):
+                loaded = self.driver.execute_async_script(
+                    LOAD_OLDER_MESSAGES_JS, int(settings.TIMEOUTS['history_page'] * 1000)
+                )
+                if not loaded:
+                    break  # Reached the start of the conversation
+
+        start = 0
+        while True:
+            with self.lock:
+                self._open_chat(contact_name_or_number)
+                page = self.driver.execute_script(EXTRACT_MESSAGES_JS, start, chunk_size, after_id)
+            after_id = None
+            if not page['messages']:
+                return
+            yield page['messages']
+            start = page['start'] + len(page['messages'])
+            if start >= page['total']:
+                return
+
+    def sync_messages(self, contact_name_or_number, history_pages=0):
+        """Copy messages newer than the chat's sync cursor into the local store"""
+        # Loading older history means rows before the cursor are wanted too
+        cursor = None if history_pages else self.store.get_cursor(contact_name_or_number)
+        added = 0
+        for chunk in self.iter_chat_messages(contact_name_or_number, history_pages=history_pages, after_id=cursor):
+            added += self.store.upsert(contact_name_or_number, chunk)
+        return added
+
+    @timed('view_messages')
+    def view_messages(self, contact_name_or_number, history_pages=0):
+        """Sync the chat and return its stored messages as records, or None on failure"""
+        def attempt():
+            self.sync_messages(contact_name_or_number, history_pages)
+            return self.store.history(contact_name_or_number)
+        return self._resilient('view_messages', attempt, "Failed to view messages")
+
+    @timed('download_media')
+    def download_media(self, contact_name_or_number, limit=20):
+        """Save images/videos shown in a chat to media/downloads; returns the new file paths.
+
+        Files are stored by content hash, so media already on disk (from
+        this chat or any other) is neither fetched again nor duplicated.
+        """
+        start = time.perf_counter()
+        saved = []
+        size = 0
+
+        def attempt():
+            with self.lock, self.media_allowed():
+                if settings.LEAN_MODE:
+                    # Media blocked while the chat was last rendered only loads on a fresh page
+                    self.current_chat = None
+                    self.navigator.forget(self._resolve_number(contact_name_or_number))
+                self._open_chat(contact_name_or_number)
+                wait_for(self.driver, 'chat_container', settings.TIMEOUTS['action'])
+                return self.driver.execute_async_script(
+                    COLLECT_MEDIA_JS, self.media.downloaded_ids(), limit, settings.MEDIA_DOWNLOAD_MAX_BYTES
+                )
+        items = self._resilient('download_media', attempt, "Media download failed")
+        if items is None:
+            return None
+        try:
+            for item in items:
+                data = base64.b64decode(item['data'])
+                size += len(data)
+                path, is_new = self.media.store_download(data, item['id'] + extension_for(item['mime']), item['id'])
+                if is_new:
+                    saved.append(path)
+        except Exception as e:
+            handle_error(f"Media download failed: {str(e)}")
+            return None
+        elapsed = time.perf_counter() - start
+        metrics.inc('media_download_bytes', size)
+        print(f"[✓] Downloaded {len(saved)} new file(s) of {len(items)}: {format_rate(size, elapsed)}")
+        return saved
+
     def monitor_messages(self):
-        """Background monitoring (unchanged)"""
+        """Background monitoring: drain the in-page observer buffer in batches"""
         while self.running:
+            if not self.lock.acquire(blocking=False):
+                time.sleep(0.05)  # A command is running; the page keeps buffering meanwhile
+                continue
+            try:
+                if settings.MEMORY_BUDGET_MB and time.monotonic() >= self.next_memory_check:
+                    self.check_memory()
+                batch = self.driver.execute_async_script(
+                    MONITOR_DRAIN_JS, int(settings.MONITOR_LONGPOLL * 1000)
+                )
+            except Exception as e:
+                batch = None
+                if self.running:
+                    handle_error(f"Monitoring error: {str(e)}")
+            finally:
+                self.lock.release()
+
+            if batch is None:
+                time.sleep(settings.POLL_INTERVAL)
+                continue
+            self._dispatch_messages(batch)
+            time.sleep(0.01)  # Let threads blocked on the lock in first
+
+    def _dispatch_messages(self, batch):
+        received_at = time.time()
+        fresh = []
+        for message in batch:
+            if message['id'] in self.last_messages:
+                continue
+            self.last_messages[message['id']] = received_at
+            if len(self.last_messages) > settings.MONITOR_SEEN_LIMIT:
+                self.last_messages.popitem(last=False)
+            if message['kind'] == 'message':
+                message['chat'] = self._chat_key(message)
+            message['received_at'] = received_at
+            fresh.append(message)
+
+        stored = [m for m in fresh if m['kind'] == 'message' and m['chat']]
+        for chat, group in itertools.groupby(stored, key=lambda m: m['chat']):
             try:
-                pass  # Implementation here
+                # Not advancing the cursor: rows between it and these may be unsynced
+                self.store.upsert(chat, list(group), advance_cursor=False)
             except Exception as e:
-                handle_error(f"Monitoring error: {str(e)}")
-            time.sleep(settings.POLL_INTERVAL)
+                handle_error(f"Storing monitored messages failed: {str(e)}")
+
+        for message in fresh:
+            if not message.get('incoming'):
+                continue
+            for subscriber in list(self.subscribers):
+                subscriber.put(message)
+            for callback in list(self.message_callbacks):
+                try:
+                    callback(message)
+                except Exception as e:
+                    handle_error(f"Message callback failed: {str(e)}")
+
+    def on_message(self, callback):
+        """Call callback(message) from the monitor thread for every new incoming message"""
+        self.message_callbacks.append(callback)
+        return callback
+
+    def iter_messages(self, timeout=None):
+        """Yield new incoming messages as they arrive.
+
+        Each message is a dict with id, kind, chat, sender, timestamp, text
+        and received_at. Stops after ``timeout`` seconds without a message
+        when given, otherwise runs until the client is cleaned up.
+        """
+        subscriber = queue.Queue()
+        self.subscribers.append(subscriber)
+        try:
+            while self.running:
+                try:
+                    yield subscriber.get(timeout=timeout if timeout is not None else 1.0)
+                except queue.Empty:
+                    if timeout is not None:
+                        return
+        finally:
+            self.subscribers.remove(subscriber)
+
+    def _chat_key(self, message):
+        """Store key for a monitored message, from the row's own jid rather than the open chat.
+
+        The buffer may be drained after a switch to another chat, so client
+        state cannot tell which chat a row came from. One-to-one chats are
+        keyed like view_messages keys them, by the number they were opened
+        with; other rows keep the header title recorded in the page.
+        """
+        jid = message.get('jid') or ''
+        if jid.endswith('@c.us'):
+            phone = jid.split('@')[0]
+            return self.chat_keys.get(phone, '+' + phone)
+        return message.get('chat')
 
     def start_message_monitor(self):
         """Start monitor thread (unchanged)"""
@@ -310,9 +884,18 @@ class WhatsAppClient:
         monitor_thread.daemon = True
         monitor_thread.start()
 
+    def is_alive(self):
+        """Cheap health probe: True while the browser still answers commands"""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
     def cleanup(self):
         """Cleanup (unchanged)"""
         self.running = False
+        self.media.shutdown()
         if self.driver:
             self.driver.quit()
             print("[✓] Browser session closed")
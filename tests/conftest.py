@@ -0,0 +1,27 @@
+import pytest
+
+
+class FakeClient:
+    """Records sends instead of driving a browser"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, number, message):
+        self.sent.append((number, message))
+        return True
+
+
+class FakeContacts:
+    def get_number(self, query):
+        return query
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+@pytest.fixture
+def contacts():
+    return FakeContacts()
@@ -0,0 +1,20 @@
+import io
+import json
+
+from src.batch_runner import BatchRunner
+
+
+def test_non_object_jobs_fail_alone_and_the_checkpoint_advances(tmp_path, client, contacts):
+    source = tmp_path / 'jobs.jsonl'
+    source.write_text('"oops"\n[1]\n{"op": "send", "to": "+15551234567", "text": "hi"}\n')
+    checkpoint = tmp_path / 'checkpoint.json'
+    out = io.StringIO()
+
+    ok, failed = BatchRunner(client, contacts, concurrency=1,
+                             checkpoint_path=str(checkpoint)).run(str(source), results_stream=out)
+
+    results = sorted((json.loads(line) for line in out.getvalue().splitlines()), key=lambda r: r['offset'])
+    assert (ok, failed) == (1, 2)
+    assert [r['error'] for r in results[:2]] == ["Job must be a JSON object"] * 2
+    assert json.loads(checkpoint.read_text())['offset'] == 3
+    assert client.sent == [('+15551234567', 'hi')]
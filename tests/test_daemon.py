@@ -0,0 +1,104 @@
+import json
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from src.batch_runner import BatchRunner
+from src.daemon import DaemonClient, Handler, WhatsAppDaemon
+from src.scheduler import SendScheduler
+
+
+def make_daemon(client, contacts):
+    daemon = WhatsAppDaemon.__new__(WhatsAppDaemon)  # Skip the browser
+    daemon.scheduler = SendScheduler(client, workers=1)
+    daemon.runner = BatchRunner(client, contacts, scheduler=daemon.scheduler)
+    return daemon
+
+
+def test_scheduled_send_reply_is_serializable_and_sent_once(client, contacts):
+    daemon = make_daemon(client, contacts)
+    try:
+        response = daemon._reply({'op': 'send', 'to': '+15551234567', 'text': 'hi'})
+    finally:
+        daemon.scheduler.close()
+    assert response['ok'] is True
+    assert response['error'] is None
+    json.dumps(response)
+    assert client.sent == [('+15551234567', 'hi')]
+
+
+class EchoDaemon:
+    """Stands in for WhatsAppDaemon behind the real socket handler"""
+
+    def __init__(self):
+        self.requests = []
+
+    def _reply(self, request):
+        self.requests.append(request)
+        if request['op'] == 'bad_reply':
+            return {'ok': True, 'value': object()}
+        return {'ok': True, 'error': None}
+
+
+class OneRequestHandler(Handler):
+    """Answers one request, then closes the connection (like a daemon restart)"""
+
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        self.wfile.write((json.dumps(self.server.daemon._reply(request)) + "\n").encode('utf-8'))
+
+
+class LostReplyHandler(Handler):
+    """Acts on the request but the reply never arrives"""
+
+    def handle(self):
+        self.server.daemon._reply(json.loads(self.rfile.readline()))
+
+
+def serve(tmp_path, handler=Handler):
+    path = str(tmp_path / 'daemon.sock')
+    server = socketserver.ThreadingUnixStreamServer(path, handler)
+    server.daemon_threads = True
+    server.daemon = EchoDaemon()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, path
+
+
+def run_client(tmp_path, handler, body):
+    server, path = serve(tmp_path, handler)
+    client = DaemonClient(path)
+    try:
+        body(client, server.daemon)
+    finally:
+        client.cleanup()
+        server.shutdown()
+        server.server_close()
+
+
+def test_unencodable_reply_is_reported_and_connection_survives(tmp_path):
+    def body(client, daemon):
+        response = client.request('bad_reply')
+        assert response['ok'] is False
+        assert 'Could not encode reply' in response['error']
+        assert client.request('ping')['ok'] is True
+    run_client(tmp_path, Handler, body)
+
+
+def test_send_is_not_replayed_when_the_reply_is_lost(tmp_path):
+    def body(client, daemon):
+        with pytest.raises(ConnectionError):
+            client.request('send', to='+15551234567', text='hi')
+        assert [r['op'] for r in daemon.requests] == ['send']
+    run_client(tmp_path, LostReplyHandler, body)
+
+
+def test_closed_connection_is_reopened_before_sending(tmp_path):
+    def body(client, daemon):
+        assert client.request('ping')['ok'] is True
+        time.sleep(0.05)  # Let the handler close its end
+        assert client.request('send', to='+15551234567', text='hi')['ok'] is True
+        assert [r['op'] for r in daemon.requests] == ['ping', 'send']
+    run_client(tmp_path, OneRequestHandler, body)
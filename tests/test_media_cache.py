@@ -0,0 +1,32 @@
+import json
+import threading
+
+from config import settings
+from src.utils.media import MediaPipeline, get_media_cache
+
+
+def test_pool_workers_share_one_cache_per_directory(tmp_path, monkeypatch):
+    monkeypatch.setitem(settings.PATHS, 'media_cache', str(tmp_path / 'cache'))
+    monkeypatch.setitem(settings.PATHS, 'media_download', str(tmp_path / 'downloads'))
+    first, second = MediaPipeline(workers=1), MediaPipeline(workers=1)
+    try:
+        assert first.downloads is second.downloads
+        assert first.uploads is get_media_cache(str(tmp_path / 'cache'))
+
+        def store(pipeline, worker):
+            for i in range(50):
+                pipeline.downloads.put_bytes(f"{worker}-{i}".encode(), 'photo.jpg', alias=f"msg-{worker}-{i}")
+
+        threads = [threading.Thread(target=store, args=(pipeline, worker))
+                   for worker, pipeline in enumerate((first, second))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(tmp_path / 'downloads' / 'index.json', encoding='utf-8') as f:
+            index = json.load(f)
+        assert sum(key.startswith('msg-') for key in index) == 100
+    finally:
+        first.shutdown()
+        second.shutdown()
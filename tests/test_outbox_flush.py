@@ -0,0 +1,51 @@
+import threading
+
+from config import settings
+from src.utils.outbox import Outbox
+from src.utils.phone import InvalidNumberError
+from src.utils.resilience import CircuitBreaker
+from src.whatsapp_client import WhatsAppClient
+from selenium.common.exceptions import StaleElementReferenceException
+
+
+def make_client(tmp_path, type_message):
+    client = WhatsAppClient.__new__(WhatsAppClient)  # Skip the browser
+    client.lock = threading.Lock()
+    client.attempt = threading.local()
+    client.breaker = CircuitBreaker()
+    client.outbox = Outbox(str(tmp_path / 'outbox.jsonl'))
+    client.current_chat = None
+    client.media = None
+    client.is_alive = lambda: True
+    client._open_chat = lambda number: None
+    client._type_message = lambda text: type_message(client, text)
+    return client
+
+
+def statuses(report):
+    return {r['id']: (r['status'], r['queued']) for r in report['results']}
+
+
+def test_failed_items_are_dropped_when_permanent_committed_or_out_of_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_MAX_ATTEMPTS', 2)
+
+    def type_message(client, text):
+        if text == 'invalid':
+            raise InvalidNumberError("not on WhatsApp")
+        if text == 'committed':
+            client.attempt.committed = True
+        raise StaleElementReferenceException("stale")
+
+    client = make_client(tmp_path, type_message)
+    ids = {text: client.outbox.put('+15551234567', 'text', text=text)
+           for text in ('invalid', 'committed', 'flaky')}
+
+    first = statuses(client.flush())
+    assert first[ids['invalid']] == ('failed', False)
+    assert first[ids['committed']] == ('failed', False)
+    assert first[ids['flaky']] == ('failed', True)
+    assert [item['id'] for item in client.outbox.pending()] == [ids['flaky']]
+
+    second = statuses(client.flush())
+    assert second == {ids['flaky']: ('failed', False)}  # Second of OUTBOX_MAX_ATTEMPTS
+    assert Outbox(str(tmp_path / 'outbox.jsonl')).pending() == []